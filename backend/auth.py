@@ -0,0 +1,125 @@
+# ---- Auth key / frontend allowlist check as a pure ASGI middleware ----
+import hmac
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+AUTH_LOG_LEVEL = os.getenv("AUTH_LOG_LEVEL", "WARNING").upper()
+
+FORBIDDEN_BODY = json.dumps({"detail": "Forbidden: Invalid auth key or referer"}).encode()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the record's `fields`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _queue_logger(name: str, level: str) -> tuple:
+    """
+    Logger whose records are put on an in-memory queue; a listener thread formats
+    and writes them, so the event loop never waits on stderr / the log file.
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, handler, respect_handler_level=False)
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger.handlers = [QueueHandler(log_queue)]
+    return logger, listener
+
+
+auth_logger, auth_log_listener = _queue_logger("auth", AUTH_LOG_LEVEL)
+
+
+class AuthMiddleware:
+    """
+    Lets a request through when its X-Auth-Key matches one of `keys` (compared in
+    constant time) or its X-Frontend-Source is an allowed frontend URL; answers
+    403 otherwise. Runs on the raw ASGI scope: no Request object, and responses
+    (PDFs, NDJSON/SSE streams) are passed through untouched.
+    """
+
+    def __init__(self, app, keys, allowed_frontends):
+        self.app = app
+        self.keys = [key.encode() for key in keys if key]
+        # Trailing slashes are ignored on both sides, as before
+        self.allowed_frontends = frozenset(url.rstrip("/").encode() for url in allowed_frontends if url)
+
+    def allowed(self, key, referer) -> bool:
+        if key:
+            # Check every key so the time taken doesn't tell which (if any) matched
+            matched = False
+            for candidate in self.keys:
+                matched |= hmac.compare_digest(key, candidate)
+            if matched:
+                return True
+        return referer is not None and referer.rstrip(b"/") in self.allowed_frontends
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        key = referer = None
+        for name, value in scope["headers"]:
+            if name == b"x-auth-key":
+                key = value
+            elif name == b"x-frontend-source":
+                referer = value
+
+        if not self.allowed(key, referer):
+            auth_logger.warning(
+                "request rejected",
+                extra={"fields": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "client": (scope.get("client") or ("", 0))[0],
+                    "has_key": key is not None,
+                    "referer": referer.decode("latin-1") if referer else None,
+                }},
+            )
+            return await _send_json(send, 403, FORBIDDEN_BODY)
+
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            # Same contract as the old middleware: an unhandled error becomes a JSON 500,
+            # unless part of the response has already gone out
+            auth_logger.exception("unhandled error", extra={"fields": {"path": scope["path"]}})
+            if started:
+                raise
+            body = json.dumps({"detail": f"Internal Server Error: {str(e)}"}).encode()
+            await _send_json(send, 500, body)
+
+
+async def _send_json(send, status: int, body: bytes):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,439 @@
+# ---- In-process batch engine for custom resume generation ----
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
+from pathlib import Path
+
+from anyio.from_thread import start_blocking_portal
+
+from resume_api import extract_job_info, tailor_resume, increment_customize_count, write_cover_letter
+from recustomize import META_FILENAME, build_meta, digest, recustomize
+from tracing import trace, span
+
+JOBS_DIR = Path("data") / "jobs"
+BATCH_DIR = Path("data") / "batches"
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_EXTRACT_WORKERS = int(os.getenv("BATCH_EXTRACT_WORKERS", "2"))
+
+
+def _write_text_atomic(path: Path, text: str):
+    """Write next to the target and rename it over, so readers never see half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _write_json_atomic(path: Path, data):
+    _write_text_atomic(path, json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def sheet_numbers(sheet_name: str) -> list:
+    """Return the job numbers saved for a sheet, in numeric order."""
+    jobs_dir = JOBS_DIR / sheet_name
+    if not jobs_dir.exists():
+        return []
+    return sorted(
+        [p.name for p in jobs_dir.iterdir() if p.is_dir() and p.name.isdigit()],
+        key=lambda x: int(x)
+    )
+
+
+def customized_sheets(name: str) -> list:
+    """Return the sheets holding a custom resume of `name` that records its provenance."""
+    if not JOBS_DIR.exists():
+        return []
+    return sorted(
+        p.name for p in JOBS_DIR.iterdir()
+        if p.is_dir() and any((p / number / name / META_FILENAME).exists() for number in sheet_numbers(p.name))
+    )
+
+
+class BatchEngine:
+    """
+    Runs customization jobs for a sheet against one or more resumes.
+    Each job description is extracted once on the extract pool, then one rewrite
+    task per resume is queued on the shared rewrite pool. Every batch is persisted
+    as a snapshot, data/batches/<batch_id>.json, written when it starts and when it
+    finishes, plus one appended line per task outcome in <batch_id>.outcomes.jsonl,
+    so progress can be polled and unfinished batches can be picked up again after
+    a restart. Model calls share the
+    RPM/TPM budget of rate_limiter.model_limiter with the interactive endpoints:
+    the worker threads run the async customization pipeline on the app's event
+    loop (see use_portal), so they also share its in-flight table and client.
+
+    "recustomize" batches patch already generated custom resumes after their base
+    resume changed, re-running only the rewrites whose input changed.
+    """
+
+    def __init__(self, workers: int, extract_workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        self._extract_executor = ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix="batch-extract")
+        self._batches = {}
+        self._lock = threading.Lock()
+        self._path_locks = {}
+        self._portal = None
+        self._own_portal = None
+        self._stopping = False
+
+    # --- Public API ---
+    def submit(self, sheet_name: str, resumes: list, cover_letters: bool = False) -> dict:
+        """
+        Queue every (job number, resume) pair of a sheet that has no custom_resume.json yet
+        (or, with cover_letters, no cover_letter.txt yet).
+        """
+        batch = _new_batch(sheet_name, resumes, cover_letters=cover_letters)
+        for number in sheet_numbers(sheet_name):
+            for name in batch["resume_names"]:
+                task = _task_key(number, name)
+                if self._is_complete(batch, number, name):
+                    batch["skipped"].append(task)
+                else:
+                    batch["pending"].append(task)
+        return self._start(batch)
+
+    def submit_recustomize(self, sheet_name: str, resume: dict, skip_empty: bool = False):
+        """
+        Queue every custom resume of resume["name"] in a sheet that was derived from
+        another version of it. Custom resumes without provenance (generated before it
+        was recorded) and those already up to date are skipped. cover_letter.txt files
+        are left as they are. With skip_empty, returns None instead of starting a
+        batch with nothing to do.
+        """
+        batch = _new_batch(sheet_name, [resume], kind="recustomize", rewrites=0)
+        name = resume.get("name")
+        base_hash = digest(resume)
+        for number in sheet_numbers(sheet_name):
+            task = _task_key(number, name)
+            meta = _read_json(self._output_path(batch, number, name).with_name(META_FILENAME))
+            if meta and meta.get("base_hash") != base_hash:
+                batch["pending"].append(task)
+            elif meta or self._output_path(batch, number, name).exists():
+                batch["skipped"].append(task)
+        if skip_empty and not batch["pending"]:
+            return None
+        return self._start(batch)
+
+    def on_resume_saved(self, resume: dict):
+        """ResumeStore listener: look for outdated custom resumes in the background, not in the save request."""
+        if not self._stopping:
+            self._extract_executor.submit(self.recustomize_saved, resume)
+
+    def recustomize_saved(self, resume: dict) -> list:
+        """Start a recustomize batch in every sheet with outdated custom resumes of `resume`."""
+        started = []
+        for sheet_name in customized_sheets(resume.get("name")):
+            progress = self.submit_recustomize(sheet_name, resume, skip_empty=True)
+            if progress:
+                print(f"🔁 Re-customizing {progress['pending_count']} resumes of {resume.get('name')} in {sheet_name}")
+                started.append(progress)
+        return started
+
+    def progress(self, batch_id: str):
+        with self._lock:
+            batch = self._batches.get(batch_id) or self._load(batch_id)
+            if not batch:
+                return None
+            total = len(batch["pending"]) + len(batch["generated"]) + len(batch["skipped"]) + len(batch["failed"])
+            finished = total - len(batch["pending"])
+            return {
+                "batch_id": batch["batch_id"],
+                "kind": batch.get("kind", "generate"),
+                "sheet_name": batch["sheet_name"],
+                "resume_names": list(batch["resume_names"]),
+                "status": batch["status"],
+                "created_at": batch["created_at"],
+                "updated_at": batch["updated_at"],
+                "finished_at": batch["finished_at"],
+                "total": total,
+                "pending_count": len(batch["pending"]),
+                "generated_count": len(batch["generated"]),
+                "skipped_count": len(batch["skipped"]),
+                "failed_count": len(batch["failed"]),
+                "percent": round(100.0 * finished / total, 1) if total else 100.0,
+                "generated_numbers": sorted({_split_task(t)[0] for t in batch["generated"]}, key=int),
+                "generated": list(batch["generated"]),
+                "failed": dict(batch["failed"]),
+                "rewrites": batch.get("rewrites"),
+            }
+
+    def list_batches(self) -> list:
+        ids = {p.stem for p in BATCH_DIR.glob("*.json")} if BATCH_DIR.exists() else set()
+        with self._lock:
+            ids.update(self._batches)
+        items = [self.progress(batch_id) for batch_id in ids]
+        return sorted([b for b in items if b], key=lambda b: b["created_at"], reverse=True)
+
+    def resume_unfinished(self):
+        """Reschedule pending jobs of batches that were still running when the server stopped."""
+        if not BATCH_DIR.exists():
+            return
+        for path in BATCH_DIR.glob("*.json"):
+            batch = self._load(path.stem)
+            if not batch or batch["status"] != "running":
+                continue
+            with self._lock:
+                if batch["batch_id"] in self._batches:
+                    continue
+                self._batches[batch["batch_id"]] = batch
+            print(f"🔁 Resuming batch {batch['batch_id']} ({len(batch['pending'])} jobs left)")
+            self._schedule(batch)
+
+    def use_portal(self, portal):
+        """Run the pipeline through `portal`, a BlockingPortal on the app's event loop (set by the lifespan)."""
+        self._portal = portal
+
+    def shutdown(self):
+        # Tasks cut short from here on stay pending and are resumed after the restart
+        self._stopping = True
+        self._extract_executor.shutdown(wait=False, cancel_futures=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._own_portal:
+            self._own_portal.__exit__(None, None, None)
+
+    def _call(self, fn, *args):
+        """
+        Run the async pipeline function fn(*args) from a worker thread and wait for it.
+        The thread's context (current trace span, usage meter) goes along. Without a
+        portal from the app (scripts, tests) a private event loop is started on first use.
+        """
+        portal = self._portal
+        if portal is None:
+            with self._lock:
+                if self._own_portal is None:
+                    self._own_portal = start_blocking_portal()
+                    self._portal = self._own_portal.__enter__()
+                portal = self._portal
+        return portal.call(_in_context, copy_context(), fn, *args)
+
+    # --- Internals ---
+    def _start(self, batch: dict) -> dict:
+        with self._lock:
+            self._batches[batch["batch_id"]] = batch
+            self._finish_if_done(batch)
+            self._save(batch)
+        self._schedule(batch)
+        return self.progress(batch["batch_id"])
+
+    def _output_path(self, batch: dict, number: str, name: str) -> Path:
+        return JOBS_DIR / batch["sheet_name"] / number / name / "custom_resume.json"
+
+    def _is_complete(self, batch: dict, number: str, name: str) -> bool:
+        out_path = self._output_path(batch, number, name)
+        if not out_path.exists():
+            return False
+        return not batch.get("cover_letters") or (out_path.parent / "cover_letter.txt").exists()
+
+    def _schedule(self, batch: dict):
+        if batch.get("kind") == "recustomize":
+            # job_info comes from the stored provenance, nothing to extract
+            for task in batch["pending"]:
+                number, name = _split_task(task)
+                self._executor.submit(self._run_recustomize, batch["batch_id"], number, name)
+            return
+
+        by_number = {}
+        for task in batch["pending"]:
+            number, name = _split_task(task)
+            by_number.setdefault(number, []).append(name)
+        for number in sorted(by_number, key=int):
+            self._extract_executor.submit(self._run_job, batch["batch_id"], number, by_number[number])
+
+    def _run_job(self, batch_id: str, number: str, names: list):
+        """Extract the job description once, then fan the rewrites out to the shared pool."""
+        batch = self._batches[batch_id]
+        try:
+            with trace("batch.extract", batch_id=batch_id, number=number, resumes=len(names)):
+                with span("read_description"):
+                    desc_path = JOBS_DIR / batch["sheet_name"] / number / "job_description.txt"
+                    text = desc_path.read_text(encoding="utf-8").strip() if desc_path.exists() else ""
+                if not text:
+                    for name in names:
+                        self._record(batch, _task_key(number, name), "skipped")
+                    return
+
+                job_info = self._call(extract_job_info, text)
+        except Exception as e:
+            print(f"❌ Failed job #{number}: {e}")
+            for name in names:
+                self._record(batch, _task_key(number, name), "failed", str(e))
+            return
+
+        for name in names:
+            self._executor.submit(self._run_rewrite, batch_id, number, name, job_info, text)
+
+    def _run_rewrite(self, batch_id: str, number: str, name: str, job_info: dict, text: str):
+        batch = self._batches[batch_id]
+        task = _task_key(number, name)
+        out_path = self._output_path(batch, number, name)
+        try:
+            with trace("batch.rewrite", batch_id=batch_id, number=number, resume=name), self._path_lock(out_path):
+                if self._is_complete(batch, number, name):
+                    return self._record(batch, task, "skipped")
+
+                if out_path.exists():
+                    custom_resume = json.loads(out_path.read_text(encoding="utf-8"))
+                else:
+                    resume = batch["resumes"][name]
+                    custom_resume = self._call(tailor_resume, resume, job_info)
+                    with span("write_resume"):
+                        _write_json_atomic(out_path, custom_resume)
+                        _write_json_atomic(out_path.with_name(META_FILENAME), build_meta(resume, job_info))
+                    with span("count"):
+                        increment_customize_count(name or "unknown_user")
+
+                if batch.get("cover_letters"):
+                    cover_letter = self._call(write_cover_letter, custom_resume, text)
+                    with span("write_cover_letter"):
+                        _write_text_atomic(out_path.parent / "cover_letter.txt", cover_letter)
+                with span("record"):
+                    self._record(batch, task, "generated")
+        except Exception as e:
+            print(f"❌ Failed job #{number} for {name}: {e}")
+            self._record(batch, task, "failed", str(e))
+
+    def _run_recustomize(self, batch_id: str, number: str, name: str):
+        batch = self._batches[batch_id]
+        task = _task_key(number, name)
+        out_path = self._output_path(batch, number, name)
+        meta_path = out_path.with_name(META_FILENAME)
+        try:
+            with trace("batch.recustomize", batch_id=batch_id, number=number, resume=name) as root, \
+                    self._path_lock(out_path):
+                resume = batch["resumes"][name]
+                with span("read"):
+                    meta = _read_json(meta_path)
+                    custom_resume = _read_json(out_path)
+                if not meta or custom_resume is None or meta.get("base_hash") == digest(resume):
+                    return self._record(batch, task, "skipped")
+
+                custom_resume, rewrites = self._call(recustomize, custom_resume, meta, resume)
+                root.set(rewrites=rewrites)
+                with span("write_resume"):
+                    _write_json_atomic(out_path, custom_resume)
+                    _write_json_atomic(meta_path, build_meta(resume, meta["job_info"], meta.get("created_at")))
+                with span("record"):
+                    self._record(batch, task, "generated", rewrites=rewrites)
+        except Exception as e:
+            print(f"❌ Failed to re-customize job #{number} for {name}: {e}")
+            self._record(batch, task, "failed", str(e))
+
+    def _path_lock(self, path: Path) -> threading.Lock:
+        """One lock per custom resume, so no two batches (generate or recustomize) write its files at once."""
+        with self._lock:
+            return self._path_locks.setdefault(str(path), threading.Lock())
+
+    def _record(self, batch: dict, task: str, outcome: str, error: str = None, rewrites: int = 0):
+        """Apply a task outcome and append it to the batch's outcome log (one short line, not the whole batch)."""
+        entry = {"task": task, "outcome": outcome, "at": datetime.utcnow().isoformat()}
+        if error is not None:
+            entry["error"] = error
+        if rewrites:
+            entry["rewrites"] = rewrites
+        with self._lock:
+            if self._stopping and outcome == "failed":
+                return  # interrupted by the shutdown, not a real failure
+            _apply_outcome(batch, entry)
+            with open(_outcomes_path(batch["batch_id"]), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if self._finish_if_done(batch):
+                self._save(batch)
+
+    def _finish_if_done(self, batch: dict) -> bool:
+        if not batch["pending"] and batch["status"] == "running":
+            batch["status"] = "done"
+            batch["finished_at"] = datetime.utcnow().isoformat()
+            return True
+        return False
+
+    def _save(self, batch: dict):
+        """Write the snapshot; the outcomes logged so far are part of it, so the log starts over."""
+        _write_json_atomic(BATCH_DIR / f"{batch['batch_id']}.json", batch)
+        _outcomes_path(batch["batch_id"]).unlink(missing_ok=True)
+
+    def _load(self, batch_id: str):
+        if not batch_id.isalnum():
+            return None
+        batch = _read_json(BATCH_DIR / f"{batch_id}.json")
+        if batch is None:
+            return None
+        log_path = _outcomes_path(batch_id)
+        if log_path.exists():
+            for line in log_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # last line cut short by a crash
+                _apply_outcome(batch, entry)
+            self._finish_if_done(batch)
+        return batch
+
+
+def _new_batch(sheet_name: str, resumes: list, **extra) -> dict:
+    now = datetime.utcnow().isoformat()
+    return {
+        "batch_id": uuid.uuid4().hex[:12],
+        "sheet_name": sheet_name,
+        "resume_names": [r.get("name") for r in resumes],
+        "resumes": {r.get("name"): r for r in resumes},
+        "cover_letters": False,
+        **extra,
+        "status": "running",
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None,
+        "pending": [],
+        "generated": [],
+        "skipped": [],
+        "failed": {},
+    }
+
+
+async def _in_context(context, fn, *args):
+    """Await fn(*args) with the context variables of the calling thread."""
+    for var, value in context.items():
+        var.set(value)
+    return await fn(*args)
+
+
+def _outcomes_path(batch_id: str) -> Path:
+    return BATCH_DIR / f"{batch_id}.outcomes.jsonl"
+
+
+def _apply_outcome(batch: dict, entry: dict):
+    task, outcome = entry["task"], entry["outcome"]
+    if task not in batch["pending"]:
+        return  # already in the snapshot
+    batch["pending"].remove(task)
+    if outcome == "failed":
+        batch["failed"][task] = entry.get("error")
+    else:
+        batch[outcome].append(task)
+    if entry.get("rewrites"):
+        batch["rewrites"] = batch.get("rewrites", 0) + entry["rewrites"]
+    batch["updated_at"] = entry["at"]
+
+
+def _read_json(path: Path):
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def _task_key(number: str, name: str) -> str:
+    return f"{number}/{name}"
+
+
+def _split_task(task: str) -> tuple:
+    number, name = task.split("/", 1)
+    return number, name
+
+
+batch_engine = BatchEngine(BATCH_WORKERS, BATCH_EXTRACT_WORKERS)
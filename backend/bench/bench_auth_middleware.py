@@ -0,0 +1,134 @@
+"""
+Per-request overhead of the auth check: the old @app.middleware("http") version
+(BaseHTTPMiddleware, two prints per request) against auth.AuthMiddleware, on a
+bare FastAPI app so the middleware is the only cost that differs.
+
+    cd backend && python bench/bench_auth_middleware.py [--requests 5000] [--stream-chunks 64]
+
+Requests go through httpx.ASGITransport in-process (no sockets). The prints of the
+old middleware are sent to /dev/null, which is cheaper than the startup.log they
+went to in production, so its numbers are a lower bound.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from auth import AuthMiddleware  # noqa: E402
+
+KEY = "bench-key"
+FRONTEND = "http://localhost:3001/schedules/bench"
+
+
+def build_app(stream_chunks: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for _ in range(stream_chunks):
+                yield b"x" * 1024
+
+        return StreamingResponse(body(), media_type="application/octet-stream")
+
+    return app
+
+
+def old_app(stream_chunks: int) -> FastAPI:
+    """The middleware as it was in main.py."""
+    app = build_app(stream_chunks)
+
+    @app.middleware("http")
+    async def verify_api_key(request: Request, call_next):
+        try:
+            key = request.headers.get("X-Auth-Key")
+            referer = (request.headers.get("X-Frontend-Source") or "").rstrip("/")
+            print(FRONTEND)
+            print(referer)
+            if key and key == KEY:
+                return await call_next(request)
+            if referer == FRONTEND:
+                return await call_next(request)
+            return JSONResponse(status_code=403, content={"detail": "Forbidden"})
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"detail": f"Internal Server Error: {str(e)}"})
+
+    return app
+
+
+def new_app(stream_chunks: int) -> FastAPI:
+    app = build_app(stream_chunks)
+    app.add_middleware(AuthMiddleware, keys=[KEY], allowed_frontends=[FRONTEND])
+    return app
+
+
+def bare_app(stream_chunks: int) -> FastAPI:
+    return build_app(stream_chunks)
+
+
+async def measure(app: FastAPI, path: str, headers: dict, requests: int) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):  # warm-up
+            await client.get(path, headers=headers)
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            await response.aread()
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summary(samples: list) -> dict:
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1e6
+
+    return {"mean": sum(ordered) / len(ordered) * 1e6, "p50": pct(0.50), "p99": pct(0.99)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--stream-chunks", type=int, default=64, help="1 KiB chunks in the /stream response")
+    args = parser.parse_args()
+
+    cases = [
+        ("key", "/ping", {"X-Auth-Key": KEY}),
+        ("referer", "/ping", {"X-Frontend-Source": FRONTEND + "/"}),
+        ("rejected", "/ping", {"X-Auth-Key": "wrong"}),
+        ("key+stream", "/stream", {"X-Auth-Key": KEY}),
+    ]
+    builds = [("none", bare_app), ("old", old_app), ("new", new_app)]
+
+    print(f"{'case':<12}{'middleware':<12}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'overhead us':>13}")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = {}
+        for case, path, headers in cases:
+            for build, factory in builds:
+                results[case, build] = summary(await measure(factory(args.stream_chunks), path, headers, args.requests))
+
+    for case, _, _ in cases:
+        baseline = results[case, "none"]["mean"]
+        for build, _ in builds:
+            row = results[case, build]
+            overhead = "" if build == "none" else f"{row['mean'] - baseline:>13.1f}"
+            print(f"{case:<12}{build:<12}{row['mean']:>10.1f}{row['p50']:>10.1f}{row['p99']:>10.1f}{overhead}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
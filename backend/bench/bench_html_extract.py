@@ -0,0 +1,76 @@
+"""
+Compare the full BeautifulSoup scrape path with the bounded incremental extractor
+over the saved HTML pages in bench/fixtures.
+
+    cd backend && python bench/bench_html_extract.py [--iterations 20] [--scale 4]
+
+--scale repeats the inline <script> blocks of each fixture to simulate heavier pages.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import html_extract  # noqa: E402
+from html_extract import extract_from_bytes, parse_page  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixtures(scale: int) -> dict:
+    pages = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+            data = f.read()
+        if scale > 1:
+            data = re.sub(rb"<script>.*?</script>", lambda m: m.group(0) * scale, data, flags=re.S)
+        pages[name] = data
+    return pages
+
+
+def measure(fn, iterations: int) -> tuple:
+    """Return (median ms per call, peak traced memory in KB, last result)."""
+    timings = []
+    result = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return timings[len(timings) // 2], peak / 1024, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--max-bytes", type=int, default=html_extract.SCRAPE_MAX_BYTES)
+    args = parser.parse_args()
+
+    backends = ["stdlib"] + (["lxml"] if html_extract.etree is not None else [])
+    print(f"backends: full (BeautifulSoup html.parser), {', '.join(backends)} (incremental, cap {args.max_bytes} bytes)")
+    print(f"{'fixture':<28}{'size KB':>9}  {'path':<8}{'ms':>9}{'peak KB':>10}{'read KB':>9}  same")
+
+    for name, data in load_fixtures(args.scale).items():
+        full_ms, full_mem, expected = measure(lambda: parse_page(data.decode("utf-8", errors="replace")), args.iterations)
+        print(f"{name:<28}{len(data) / 1024:>9.0f}  {'full':<8}{full_ms:>9.2f}{full_mem:>10.0f}{len(data) / 1024:>9.0f}")
+        for backend in backends:
+            ms, mem, (result, read) = measure(
+                lambda: extract_from_bytes(data, "utf-8", backend, args.max_bytes), args.iterations
+            )
+            same = "yes" if result == expected else f"no {result}"
+            print(f"{'':<28}{'':>9}  {backend:<8}{ms:>9.2f}{mem:>10.0f}{read / 1024:>9.0f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Local stand-in for everything the service calls out to, so it can be benchmarked offline:
+
+- POST /v1/chat/completions   OpenAI-style chat completions (JSON or streamed), canned
+                              answers from fixtures/model_responses.json picked by prompt type
+- GET  /spreadsheets/d/{id}/gviz/tq   Google Sheets CSV export of fixtures/sheets/<sheet>.csv (ETag aware)
+- GET  /pages/{name}          the HTML fixtures, as job pages for /scrape
+- GET  /stats                 calls and injected 429s per prompt type
+
+    cd backend && python bench/fake_openai.py --port 8900 --latency-ms 800 --jitter-ms 300 --rate-429 0.05
+
+Point the service at it:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=bench MODEL_NAME=bench \\
+    MODEL_URL=http://127.0.0.1:8900/v1/chat/completions SHEET_EXPORT_BASE_URL=http://127.0.0.1:8900 \\
+    MODEL_RPM=0 uvicorn main:app --port 8000
+
+MODEL_RPM=0 lifts the service's own rate limit; leave it set to measure the limiter.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# Added by bench/scenarios.py to make every operation's input unique
+REFERENCE_RE = re.compile(r"Reference: (bench-[\w-]+)")
+
+# First words of each system prompt -> prompt type of the canned answer
+PROMPT_TYPES = (
+    ("Extract from this job description", "job_extract"),
+    ("You are a professional resume writer and technical skill curator", "oneshot"),
+    ("Rewrite this profile summary", "summary"),
+    ("Rewrite these responsibilities", "experience"),
+    ("You are a technical skill curator", "skills"),
+    ("cover letter", "coverletter"),
+    ("analyze job posts", "analyze_job"),
+)
+
+
+def prompt_type(system_prompt: str) -> str:
+    for marker, kind in PROMPT_TYPES:
+        if marker in system_prompt:
+            return kind
+    return "unknown"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class FakeModel:
+    def __init__(self, latency_ms: float, jitter_ms: float, rate_429: float, retry_after_ms: int, stream_chunks: int):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.retry_after_ms = retry_after_ms
+        self.stream_chunks = stream_chunks
+        with open(os.path.join(FIXTURES_DIR, "model_responses.json"), "r", encoding="utf-8") as f:
+            self.responses = json.load(f)
+        self.calls = {}
+        self.rate_limited = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def latency(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def answer(self, kind: str, user_content: str) -> dict:
+        answer = dict(self.responses.get(kind, {}))
+        reference = REFERENCE_RE.search(user_content)
+        if kind == "job_extract" and reference:
+            # Carry the scenario's per-operation reference into job_info, so the rewrite
+            # calls that follow differ too and aren't answered by the service's cache
+            answer["skills"] = answer["skills"] + [reference.group(1)]
+        if kind == "oneshot":
+            # One rewritten entry per experience index the caller sent
+            try:
+                experience = json.loads(user_content).get("experience", [])
+            except ValueError:
+                experience = []
+            text = self.responses["experience"]["responsibilities"]
+            answer["experience"] = [{"index": item.get("index", i), "responsibilities": text} for i, item in enumerate(experience)]
+        return answer
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "rate_limited": dict(self.rate_limited),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+def create_app(model: FakeModel) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI / Google Sheets")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        user_content = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+        kind = prompt_type(system_prompt)
+        model.calls[kind] = model.calls.get(kind, 0) + 1
+
+        if model.rate_429 and random.random() < model.rate_429:
+            model.rate_limited[kind] = model.rate_limited.get(kind, 0) + 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after-ms": str(model.retry_after_ms)},
+                content={"error": {"message": "Rate limit reached (injected)", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+
+        answer = model.answer(kind, user_content)
+        content = json.dumps(answer, ensure_ascii=False)
+        if body.get("stream"):
+            # The streamed cover letter prompt asks for plain text
+            content = answer.get("cover_letter", content)
+            return StreamingResponse(stream_chunks(model, body, content), media_type="text/event-stream")
+
+        model.in_flight += 1
+        model.max_in_flight = max(model.max_in_flight, model.in_flight)
+        try:
+            await asyncio.sleep(model.latency())
+        finally:
+            model.in_flight -= 1
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or "bench",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/spreadsheets/d/{sheet_id}/gviz/tq")
+    async def sheet_csv(request: Request, sheet_id: str, sheet: str = "jobs"):
+        path = os.path.join(FIXTURES_DIR, "sheets", f"{os.path.basename(sheet)}.csv")
+        if not os.path.exists(path):
+            return PlainTextResponse("sheet not found", status_code=404)
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read().replace("{base_url}", str(request.base_url).rstrip("/"))
+        etag = '"' + hashlib.sha1(text.encode()).hexdigest()[:16] + '"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return PlainTextResponse(text, media_type="text/csv", headers={"ETag": etag})
+
+    @app.get("/pages/{name}")
+    async def page(name: str):
+        path = os.path.join(FIXTURES_DIR, os.path.basename(name))
+        if not name.endswith(".html") or not os.path.exists(path):
+            return PlainTextResponse("not found", status_code=404)
+        with open(path, "rb") as f:
+            return Response(f.read(), media_type="text/html; charset=utf-8")
+
+    @app.get("/stats")
+    async def stats():
+        return model.stats()
+
+    return app
+
+
+async def stream_chunks(model: FakeModel, body: dict, content: str):
+    """SSE chunks in the chat.completion.chunk format; the latency is spread over the chunks."""
+    chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    size = max(1, len(content) // model.stream_chunks)
+    pieces = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+    delay = model.latency() / len(pieces)
+
+    def event(delta: dict, finish_reason=None) -> str:
+        chunk = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model") or "bench",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+    yield event({"role": "assistant", "content": ""})
+    for piece in pieces:
+        await asyncio.sleep(delay)
+        yield event({"content": piece})
+    yield event({}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=800, help="mean model latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=300, help="uniform +/- jitter around the mean")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--retry-after-ms", type=int, default=1000)
+    parser.add_argument("--stream-chunks", type=int, default=40)
+    args = parser.parse_args()
+
+    model = FakeModel(args.latency_ms, args.jitter_ms, args.rate_429, args.retry_after_ms, args.stream_chunks)
+    uvicorn.run(create_app(model), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
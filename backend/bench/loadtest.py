@@ -0,0 +1,160 @@
+"""
+Load test for the resume and jobs routers: N concurrent clients call a mix of
+endpoints for a fixed time, then requests/sec and latency percentiles are printed
+for every concurrency level.
+
+    cd backend && python bench/loadtest.py --base-url https://localhost:8000 \\
+        --concurrency 50 100 200 --duration 20 --save after.json [--compare before.json]
+
+For a before/after comparison run it against both builds with the same data and
+--save each run; --compare prints the change in rps and p99. Model-backed endpoints
+(/resume/customize, /resume/coverletter) are only included with --model: point the
+server's MODEL_URL at a stub so the numbers measure this service, not the model.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import date
+
+import httpx
+
+
+def build_scenarios(client_data: dict, with_model: bool) -> list:
+    """(name, method, path, json body or None) cycled through by every client."""
+    scenarios = [
+        ("list_resumes", "GET", "/resume/", None),
+        ("counts_today", "GET", f"/resume/counts/{date.today().isoformat()}", None),
+        ("list_batches", "GET", "/jobs/batches", None),
+        ("load_job", "GET", "/jobs/load?url=https://example.com/loadtest-missing", None),
+    ]
+    resume = client_data.get("resume")
+    if resume:
+        scenarios.append(("get_resume", "GET", f"/resume/{resume['name']}", None))
+        if with_model:
+            body = {"resume": resume, "job_description": client_data["job_description"]}
+            scenarios.append(("customize", "POST", "/resume/customize", body))
+            scenarios.append(("coverletter", "POST", "/resume/coverletter", body))
+    return scenarios
+
+
+async def discover(client: httpx.AsyncClient) -> dict:
+    """Pick the first saved resume so the per-resume endpoints hit real data."""
+    names = (await client.get("/resume/")).json().get("resumes") or []
+    if not names:
+        return {}
+    resume = (await client.get(f"/resume/{names[0]}")).json()
+    if "error" in resume:
+        return {}
+    return {
+        "resume": resume,
+        "job_description": "Senior Python Engineer at Example. FastAPI, PostgreSQL, AWS, Docker, Kubernetes.",
+    }
+
+
+async def run_level(base_url: str, headers: dict, scenarios: list, concurrency: int, duration: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+    errors = 0
+    by_scenario = {}
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, verify=False, limits=limits, timeout=120) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                name, method, path, body = scenarios[i % len(scenarios)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                latencies.append(elapsed)
+                by_scenario.setdefault(name, []).append(elapsed)
+                if not ok:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1),
+        **percentiles(latencies),
+        "scenarios": {name: percentiles(samples) for name, samples in sorted(by_scenario.items())},
+    }
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"p50_ms": 0, "p95_ms": 0, "p99_ms": 0, "max_ms": 0}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+    return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": round(ordered[-1] * 1000, 1)}
+
+
+def print_table(results: list, baseline: dict = None):
+    print(f"{'clients':>8}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for row in results:
+        line = (
+            f"{row['concurrency']:>8}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10}"
+            f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
+        before = (baseline or {}).get(row["concurrency"])
+        if before:
+            line += f"   vs baseline: rps {_change(before['rps'], row['rps'])}, p99 {_change(before['p99_ms'], row['p99_ms'])}"
+        print(line)
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="https://localhost:8000")
+    parser.add_argument("--auth-key", default=os.getenv("AUTH_KEY", "defaultkey"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--duration", type=float, default=15, help="seconds per concurrency level")
+    parser.add_argument("--model", action="store_true", help="include model-backed endpoints")
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    headers = {"X-Auth-Key": args.auth_key}
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, verify=False, timeout=30) as client:
+        client_data = await discover(client)
+    scenarios = build_scenarios(client_data, args.model)
+    print(f"target {args.base_url}, {args.duration:g}s per level, scenarios: {', '.join(s[0] for s in scenarios)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = {row["concurrency"]: row for row in json.load(f)["results"]}
+
+    results = []
+    for concurrency in args.concurrency:
+        results.append(await run_level(args.base_url, headers, scenarios, concurrency, args.duration))
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"base_url": args.base_url, "scenarios": [s[0] for s in scenarios], "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,243 @@
+"""
+Scenario benchmarks against a running service wired to bench/fake_openai.py (see its
+docstring for the environment to start the service with). Each scenario runs a fixed
+number of operations with N concurrent clients and reports throughput and p50/p95/p99.
+
+    cd backend && python bench/scenarios.py --base-url http://127.0.0.1:8000 --fake-url http://127.0.0.1:8900 \\
+        [--scenario customize pdf ...] [--requests 200] [--concurrency 20] --save run.json [--compare before.json]
+
+Scenarios: customize, coverletter, pdf, extract, scrape, jobs_save_load, generate_custom_resumes.
+Inputs are made unique per operation so the model and PDF caches don't answer for the
+service; pass --cached to measure the warm path instead. A generate_custom_resumes
+operation is one whole batch on a fresh sheet (--batch-jobs job descriptions), timed
+from saving the descriptions until the batch reports done. /resume/pdf answers 503
+when the render queue is full; those count as errors.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+from loadtest import percentiles, _change
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+PAGES = ["job_basic.html", "job_inline_js_head.html", "job_inline_js_after.html", "job_no_description.html"]
+BATCH_POLL_SECONDS = 0.25
+
+
+def load_fixtures() -> dict:
+    with open(os.path.join(FIXTURES_DIR, "resume_bench.json"), "r", encoding="utf-8") as f:
+        resume = json.load(f)
+    with open(os.path.join(FIXTURES_DIR, "job_description.txt"), "r", encoding="utf-8") as f:
+        job_description = f.read()
+    return {"resume": resume, "job_description": job_description}
+
+
+class Context:
+    def __init__(self, args, fixtures: dict):
+        self.fake_url = args.fake_url.rstrip("/")
+        self.cached = args.cached
+        self.batch_jobs = args.batch_jobs
+        self.run_id = uuid.uuid4().hex[:8]
+        self.resume = fixtures["resume"]
+        self.job_description = fixtures["job_description"]
+
+    def unique(self, text: str, key) -> str:
+        return text if self.cached else f"{text}\nReference: bench-{self.run_id}-{key}"
+
+
+# --- Scenarios: one operation each, True when it succeeded ---
+async def customize(client: httpx.AsyncClient, ctx: Context, i: int) -> bool:
+    body = {"resume": ctx.resume, "job_description": ctx.unique(ctx.job_description, i)}
+    response = await client.post("/resume/customize", json=body)
+    return response.status_code == 200 and "error" not in response.json()
+
+
+async def coverletter(client: httpx.AsyncClient, ctx: Context, i: int) -> bool:
+    body = {"resume": ctx.resume, "job_description": ctx.unique(ctx.job_description, i)}
+    response = await client.post("/resume/coverletter", json=body)
+    return response.status_code == 200 and "error" not in response.json()
+
+
+async def pdf(client: httpx.AsyncClient, ctx: Context, i: int) -> bool:
+    resume = {**ctx.resume, "profile_summary": ctx.unique(ctx.resume["profile_summary"], i)}
+    response = await client.post("/resume/pdf", params={"style_id": 1 + i % 7}, json=resume)
+    return response.status_code == 200 and response.content.startswith(b"%PDF")
+
+
+async def extract(client: httpx.AsyncClient, ctx: Context, i: int) -> bool:
+    params = {
+        "sheet_url": "https://docs.google.com/spreadsheets/d/bench-sheet/edit",
+        "sheet_name": "jobs",
+        "fresh": not ctx.cached,
+    }
+    response = await client.get("/extract", params=params)
+    return response.status_code == 200 and bool(response.json().get("links"))
+
+
+async def scrape(client: httpx.AsyncClient, ctx: Context, i: int) -> bool:
+    url = f"{ctx.fake_url}/pages/{PAGES[i % len(PAGES)]}"
+    response = await client.get("/scrape", params={"url": url, "mode": "full" if i % 2 else "stream"})
+    return response.status_code == 200 and "error" not in response.json()
+
+
+async def jobs_save_load(client: httpx.AsyncClient, ctx: Context, i: int) -> bool:
+    url = f"{ctx.fake_url}/pages/job_basic.html?bench={ctx.run_id}-{i}"
+    body = {"url": url, "number": i + 1, "sheet_name": f"bench_{ctx.run_id}", "text": ctx.job_description}
+    saved = await client.post("/jobs/save", json=body)
+    if saved.status_code != 200 or not saved.json().get("success"):
+        return False
+    loaded = await client.get("/jobs/load", params={"url": url})
+    return loaded.status_code == 200 and loaded.json().get("found") is True
+
+
+async def generate_custom_resumes(client: httpx.AsyncClient, ctx: Context, i: int) -> bool:
+    sheet_name = f"bench_batch_{ctx.run_id}_{i}"
+    await save_batch_sheet(client, ctx, sheet_name, i)
+    resume = {**ctx.resume, "name": f"Bench Runner {ctx.run_id} {i}"}
+    started = await client.post("/jobs/generate_custom_resumes", json={"sheet_name": sheet_name, "resume": resume})
+    batch_id = started.json().get("batch_id")
+    if not batch_id:
+        return False
+    while True:
+        progress = (await client.get(f"/jobs/batches/{batch_id}")).json()
+        if progress.get("status") != "running":
+            return progress.get("failed_count") == 0
+        await asyncio.sleep(BATCH_POLL_SECONDS)
+
+
+async def save_batch_sheet(client: httpx.AsyncClient, ctx: Context, sheet_name: str, i: int):
+    jobs = [
+        {
+            "url": f"{ctx.fake_url}/pages/job_basic.html?batch={ctx.run_id}-{i}-{n}",
+            "number": n,
+            "sheet_name": sheet_name,
+            "text": ctx.unique(ctx.job_description, f"batch{i}-{n}"),
+        }
+        for n in range(1, ctx.batch_jobs + 1)
+    ]
+    response = await client.post("/jobs/save_batch", json={"jobs": jobs})
+    response.raise_for_status()
+
+
+SCENARIOS = {
+    "customize": customize,
+    "coverletter": coverletter,
+    "pdf": pdf,
+    "extract": extract,
+    "scrape": scrape,
+    "jobs_save_load": jobs_save_load,
+    "generate_custom_resumes": generate_custom_resumes,
+}
+
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, name: str, requests: int, concurrency: int) -> dict:
+    operation = SCENARIOS[name]
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                ok = await operation(client, ctx, i)
+            except (httpx.HTTPError, ValueError):
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(wall, 2),
+        "rps": round(len(latencies) / wall, 2) if wall else 0,
+        **percentiles(latencies),
+    }
+    if name == "generate_custom_resumes":
+        result["jobs_per_s"] = round(len(latencies) * ctx.batch_jobs / wall, 2) if wall else 0
+    return result
+
+
+def print_results(results: dict, baseline: dict = None):
+    print(f"{'scenario':<26}{'ops':>6}{'errors':>8}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in results.items():
+        line = (
+            f"{name:<26}{row['requests']:>6}{row['errors']:>8}{row['rps']:>9}"
+            f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+        )
+        before = (baseline or {}).get(name)
+        if before:
+            line += f"   vs baseline: ops/s {_change(before['rps'], row['rps'])}, p99 {_change(before['p99_ms'], row['p99_ms'])}"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--fake-url", default="http://127.0.0.1:8900", help="bench/fake_openai.py, as seen by the service")
+    parser.add_argument("--auth-key", default=os.getenv("AUTH_KEY", "defaultkey"))
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch-jobs", type=int, default=10, help="job descriptions per generate_custom_resumes batch")
+    parser.add_argument("--cached", action="store_true", help="repeat identical inputs (warm caches)")
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    ctx = Context(args, load_fixtures())
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"X-Auth-Key": args.auth_key}
+    results = {}
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=300, verify=False) as client:
+        for name in args.scenario:
+            # A batch already runs many jobs at once on the server
+            concurrency = min(args.concurrency, 2) if name == "generate_custom_resumes" else args.concurrency
+            requests = max(1, args.requests // 20) if name == "generate_custom_resumes" else args.requests
+            results[name] = await run_scenario(client, ctx, name, requests, concurrency)
+            print(f"{name}: {results[name]['rps']} ops/s, p99 {results[name]['p99_ms']} ms", flush=True)
+
+    async with httpx.AsyncClient(timeout=10) as client:
+        try:
+            fake_stats = (await client.get(f"{ctx.fake_url}/stats")).json()
+        except httpx.HTTPError:
+            fake_stats = None
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print()
+    print_results(results, baseline)
+    if fake_stats:
+        print(f"\nfake model calls: {fake_stats['calls']}, injected 429s: {fake_stats['rate_limited']}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "started_at": datetime.utcnow().isoformat(),
+                    "base_url": args.base_url,
+                    "cached": args.cached,
+                    "results": results,
+                    "fake": fake_stats,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+# ---- Daily customization counters ----
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date as date_cls, timedelta
+
+from metrics import store_timer
+
+COUNTS_DIR = os.path.join("data", "counts")
+COUNTS_DB_PATH = os.getenv("COUNTS_DB_PATH", os.path.join(COUNTS_DIR, "counts.sqlite3"))
+COUNTS_FLUSH_INTERVAL = float(os.getenv("COUNTS_FLUSH_INTERVAL", "2"))  # seconds
+
+
+class CounterStore:
+    """
+    Exact per-day, per-resume counters.
+    Increments are aggregated in memory under a lock and flushed to SQLite with an
+    upsert every COUNTS_FLUSH_INTERVAL seconds (and at exit). Reads add the not yet
+    flushed deltas, so they are always exact. The legacy data/counts/<date>.json
+    files are imported once per file.
+    """
+
+    def __init__(self, path: str, flush_interval: float):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = {}  # (date, name) -> delta
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._flusher = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counts ("
+                " day TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                " count INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (day, name))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS imported_files (filename TEXT PRIMARY KEY)")
+            self._conn = conn
+            self._import_legacy(conn)
+        return self._conn
+
+    def _import_legacy(self, conn: sqlite3.Connection):
+        if not os.path.isdir(COUNTS_DIR):
+            return
+        done = {row[0] for row in conn.execute("SELECT filename FROM imported_files")}
+        for filename in sorted(os.listdir(COUNTS_DIR)):
+            if not filename.endswith(".json") or filename in done:
+                continue
+            try:
+                with open(os.path.join(COUNTS_DIR, filename), "r", encoding="utf-8") as f:
+                    counts = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Skipping unreadable counts file {filename}: {e}")
+                continue
+            day = filename[:-len(".json")]
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO counts (day, name, count) VALUES (?, ?, ?)"
+                " ON CONFLICT(day, name) DO UPDATE SET count = count + excluded.count",
+                [(day, name, int(value)) for name, value in counts.items()],
+            )
+            conn.execute("INSERT INTO imported_files (filename) VALUES (?)", (filename,))
+            conn.execute("COMMIT")
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="counts-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Failed to flush counts: {e}")
+
+    def increment(self, day: str, name: str, amount: int = 1):
+        with self._lock:
+            self._pending[(day, name)] = self._pending.get((day, name), 0) + amount
+            self._ensure_flusher()
+
+    def flush(self):
+        # _db_lock is held from the swap to the COMMIT, so range() sees the deltas
+        # either still pending or already in the table, never neither
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            with store_timer("counters", "flush"):
+                db = self._db()
+                try:
+                    db.execute("BEGIN")
+                    db.executemany(
+                        "INSERT INTO counts (day, name, count) VALUES (?, ?, ?)"
+                        " ON CONFLICT(day, name) DO UPDATE SET count = count + excluded.count",
+                        [(day, name, delta) for (day, name), delta in pending.items()],
+                    )
+                    db.execute("COMMIT")
+                except Exception:
+                    db.execute("ROLLBACK")
+                    # Put the deltas back so nothing is lost
+                    with self._lock:
+                        for key, delta in pending.items():
+                            self._pending[key] = self._pending.get(key, 0) + delta
+                    raise
+
+    def range(self, start: str, end: str) -> dict:
+        """Return {day: {name: count}} for start <= day <= end (YYYY-MM-DD)."""
+        with store_timer("counters", "range"), self._db_lock:
+            rows = self._db().execute(
+                "SELECT day, name, count FROM counts WHERE day BETWEEN ? AND ?", (start, end)
+            ).fetchall()
+            with self._lock:
+                pending = dict(self._pending)
+
+        result = {}
+        for day, name, count in rows:
+            result.setdefault(day, {})[name] = count
+        for (day, name), delta in pending.items():
+            if start <= day <= end:
+                day_counts = result.setdefault(day, {})
+                day_counts[name] = day_counts.get(name, 0) + delta
+        return result
+
+    def get_day(self, day: str) -> dict:
+        return self.range(day, day).get(day, {})
+
+
+def iter_days(start: str, end: str):
+    """Yield every YYYY-MM-DD from start to end inclusive."""
+    current, last = date_cls.fromisoformat(start), date_cls.fromisoformat(end)
+    while current <= last:
+        yield current.isoformat()
+        current += timedelta(days=1)
+
+
+counter_store = CounterStore(COUNTS_DB_PATH, COUNTS_FLUSH_INTERVAL)
+atexit.register(counter_store.flush)
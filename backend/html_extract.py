@@ -0,0 +1,213 @@
+# ---- Bounded, incremental extraction of title / meta description / first <p> ----
+import codecs
+import os
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+from http_client import http_client
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, the stdlib parser is the fallback
+    etree = None
+
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(512 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+
+class _StdlibExtractor(HTMLParser):
+    """Incremental extractor on the stdlib html.parser (the one BeautifulSoup's "html.parser" uses)."""
+
+    def __init__(self, encoding: str = None):
+        super().__init__(convert_charrefs=True)
+        self._decoder = codecs.getincrementaldecoder(_codec(encoding))(errors="replace")
+        self.title = None
+        self.description = None
+        self.snippet = None
+        self.head_done = False
+        self._title_parts = None
+        self._p_parts = None
+
+    def feed_bytes(self, data: bytes):
+        self.feed(self._decoder.decode(data))
+
+    def finish(self):
+        self.feed(self._decoder.decode(b"", final=True))
+        self.close()
+        if self.title is None and self._title_parts is not None:
+            self.title = "".join(self._title_parts).strip()
+        if self.snippet is None and self._p_parts is not None:
+            self.snippet = "".join(self._p_parts)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and self.title is None:
+            self._title_parts = []
+        elif tag == "meta" and self.description is None:
+            attrs = dict(attrs)
+            if attrs.get("name") == "description" and attrs.get("content"):
+                self.description = attrs["content"].strip()
+        elif tag == "body":
+            self.head_done = True
+        elif tag == "p" and self.snippet is None:
+            self.head_done = True
+            if self._p_parts is not None:
+                # <p> can't nest: a new one implicitly closes the open one
+                self.snippet = "".join(self._p_parts)
+                self._p_parts = None
+            else:
+                self._p_parts = []
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._title_parts is not None:
+            self.title = "".join(self._title_parts).strip()
+            self._title_parts = None
+        elif tag == "head":
+            self.head_done = True
+        elif tag == "p" and self._p_parts is not None:
+            self.snippet = "".join(self._p_parts)
+            self._p_parts = None
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        if self._p_parts is not None:
+            self._p_parts.append(data.strip())
+
+
+class _LxmlExtractor:
+    """Incremental extractor on lxml's C HTML pull parser."""
+
+    def __init__(self, encoding: str = None):
+        self._parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+        self.title = None
+        self.description = None
+        self.snippet = None
+        self.head_done = False
+
+    def feed_bytes(self, data: bytes):
+        self._parser.feed(data)
+        self._read_events()
+
+    def finish(self):
+        self._parser.close()
+        self._read_events()
+
+    def _read_events(self):
+        for event, el in self._parser.read_events():
+            tag = el.tag if isinstance(el.tag, str) else ""
+            if event == "start":
+                if tag == "body":
+                    self.head_done = True
+            elif tag == "title" and self.title is None:
+                self.title = "".join(el.itertext()).strip()
+            elif tag == "meta" and self.description is None:
+                if el.get("name") == "description" and el.get("content"):
+                    self.description = el.get("content").strip()
+            elif tag == "head":
+                self.head_done = True
+            elif tag == "p" and self.snippet is None:
+                self.snippet = "".join(t.strip() for t in el.itertext())
+            if event == "end" and tag in ("script", "style"):
+                # Inline JS/CSS is the bulk of heavy pages → don't keep it in the tree
+                el.clear(keep_tail=True)
+
+
+class PageExtractor:
+    """
+    Feed an HTML page chunk by chunk; `done` turns true as soon as the title,
+    the meta description (or the end of <head>) and the first <p> were seen.
+    """
+
+    def __init__(self, encoding: str = None, backend: str = None):
+        backend = backend or ("lxml" if etree is not None else "stdlib")
+        self.backend = backend
+        self._impl = _LxmlExtractor(encoding) if backend == "lxml" else _StdlibExtractor(encoding)
+
+    def feed(self, data: bytes):
+        self._impl.feed_bytes(data)
+
+    def finish(self):
+        """Flush the parser at end of input (or at the byte cap)."""
+        try:
+            self._impl.finish()
+        except Exception:
+            pass
+
+    @property
+    def done(self) -> bool:
+        impl = self._impl
+        return (
+            impl.snippet is not None
+            and impl.title is not None
+            and (impl.description is not None or impl.head_done)
+        )
+
+    def result(self) -> dict:
+        impl = self._impl
+        return {
+            "title": impl.title or "No title found",
+            "description": impl.description or "No meta description found",
+            "snippet": impl.snippet or "No paragraph found",
+        }
+
+
+def parse_page(text: str) -> dict:
+    """Full-page path: build a BeautifulSoup tree of the whole page and read the three fields."""
+    soup = BeautifulSoup(text, "html.parser")
+
+    title = soup.title.string.strip() if soup.title else "No title found"
+    meta_desc = ""
+    meta = soup.find("meta", attrs={"name": "description"})
+    if meta and meta.get("content"):
+        meta_desc = meta["content"].strip()
+
+    first_p = ""
+    p = soup.find("p")
+    if p:
+        first_p = p.get_text(strip=True)
+
+    return {
+        "title": title,
+        "description": meta_desc or "No meta description found",
+        "snippet": first_p or "No paragraph found",
+    }
+
+
+def _codec(encoding: str = None) -> str:
+    try:
+        return codecs.lookup(encoding).name if encoding else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+def extract_from_bytes(data: bytes, encoding: str = None, backend: str = None, max_bytes: int = SCRAPE_MAX_BYTES) -> tuple:
+    """Run the incremental extractor over an in-memory page. Returns (result, bytes consumed)."""
+    extractor = PageExtractor(encoding, backend)
+    read = 0
+    while read < min(len(data), max_bytes):
+        chunk = data[read:min(read + CHUNK_SIZE, max_bytes)]
+        extractor.feed(chunk)
+        read += len(chunk)
+        if extractor.done:
+            break
+    else:
+        extractor.finish()
+    return extractor.result(), read
+
+
+async def scrape_streaming(url: str, headers: dict = None, timeout: float = 10, max_bytes: int = SCRAPE_MAX_BYTES) -> dict:
+    """Stream a page and stop downloading once the three fields are found or max_bytes were read."""
+    async with http_client.stream("GET", url, headers=headers, timeout=timeout) as res:
+        res.raise_for_status()
+        extractor = PageExtractor(res.charset_encoding)
+        read = 0
+        async for chunk in res.aiter_bytes():
+            chunk = chunk[:max_bytes - read]
+            extractor.feed(chunk)
+            read += len(chunk)
+            if extractor.done or read >= max_bytes:
+                break
+    if not extractor.done:
+        extractor.finish()
+    return extractor.result()
@@ -0,0 +1,129 @@
+# ---- Shared pooled async HTTP client for outbound calls ----
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "8"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+
+
+class HttpClient:
+    """
+    One keep-alive httpx.AsyncClient for the whole app, so outbound calls reuse
+    TCP/TLS connections. Concurrent requests per host are capped with a semaphore
+    on top of the client's global pool limits.
+    """
+
+    def __init__(self, per_host_limit: int):
+        self.per_host_limit = per_host_limit
+        self._client = None
+        self._host_slots = {}
+        self.requests = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=HTTP_TIMEOUT,
+                follow_redirects=True,
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("HTTP client is not started")
+        return self._client
+
+    @asynccontextmanager
+    async def host_slot(self, url: str):
+        """
+        Hold one of the per-host connection slots for url's host. A host's entry
+        ([semaphore, holders and waiters, in flight]) is dropped once nobody uses it,
+        so the table only ever holds the hosts being talked to.
+        """
+        host = urlsplit(url).netloc.lower()
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = [asyncio.Semaphore(self.per_host_limit), 0, 0]
+        slot[1] += 1
+        try:
+            started = time.perf_counter()
+            async with slot[0]:
+                self.wait_seconds += time.perf_counter() - started
+                slot[2] += 1
+                self.requests += 1
+                try:
+                    yield host
+                except Exception:
+                    self.errors += 1
+                    raise
+                finally:
+                    slot[2] -= 1
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._host_slots[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        await self.start()
+        async with self.host_slot(url):
+            return await self.client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """Stream a response body while holding the host slot."""
+        await self.start()
+        async with self.host_slot(url):
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    def stats(self) -> dict:
+        pool = {}
+        # httpcore's pool isn't public API, so report it only when it's reachable
+        connections = getattr(getattr(getattr(self._client, "_transport", None), "_pool", None), "connections", None)
+        if connections is not None:
+            pool = {
+                "open_connections": len(connections),
+                "idle_connections": sum(1 for c in connections if c.is_idle()),
+            }
+        return {
+            "started": self._client is not None,
+            "max_connections": HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": HTTP_MAX_KEEPALIVE,
+            "per_host_limit": self.per_host_limit,
+            "requests": self.requests,
+            "errors": self.errors,
+            "wait_seconds_total": round(self.wait_seconds, 3),
+            "pool": pool,
+            "hosts": {
+                host: {"in_flight": in_flight, "waiting": users - in_flight}
+                for host, (_, users, in_flight) in self._host_slots.items()
+            },
+        }
+
+
+http_client = HttpClient(HTTP_PER_HOST_LIMIT)
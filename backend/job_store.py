@@ -0,0 +1,112 @@
+# ---- SQLite store for saved job descriptions ----
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from metrics import store_timer
+
+JOBS_DIR = os.path.join("data", "jobs")
+INDEX_PATH = os.path.join(JOBS_DIR, "index.json")
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(JOBS_DIR, "jobs.sqlite3"))
+
+
+class JobStore:
+    """
+    URL -> (sheet_name, number, text) store in SQLite (WAL mode).
+    Replaces the whole-file rewrite of data/jobs/index.json; job_description.txt
+    files are still written so the directory layout stays the same.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " url TEXT NOT NULL UNIQUE,"
+                " sheet_name TEXT NOT NULL,"
+                " number TEXT NOT NULL,"
+                " text TEXT,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_sheet_number ON jobs(sheet_name, number)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn = conn
+            self._migrate(conn)
+        return self._conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """One-time import of data/jobs/index.json and the job_description.txt tree."""
+        if conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone():
+            return
+
+        index = {}
+        if os.path.exists(INDEX_PATH):
+            try:
+                with open(INDEX_PATH, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Could not read {INDEX_PATH} for migration: {e}")
+
+        rows = []
+        for url, entry in index.items():
+            sheet_name, number = entry.get("sheet_name"), entry.get("number")
+            if not sheet_name or not number:
+                continue
+            file_path = Path(JOBS_DIR) / sheet_name / str(number) / "job_description.txt"
+            text = file_path.read_text(encoding="utf-8") if file_path.exists() else None
+            rows.append((url, sheet_name, str(number), text, time.time()))
+
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT OR IGNORE INTO jobs (url, sheet_name, number, text, updated_at) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)", (str(time.time()),))
+        conn.execute("COMMIT")
+        if rows:
+            print(f"✅ Migrated {len(rows)} jobs from {INDEX_PATH} into {self.path}")
+
+    def save_many(self, entries: list):
+        """Upsert (url, sheet_name, number, text) tuples in a single transaction."""
+        now = time.time()
+        with store_timer("job_store", "save"), self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                db.executemany(
+                    "INSERT INTO jobs (url, sheet_name, number, text, updated_at) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(url) DO UPDATE SET sheet_name = excluded.sheet_name,"
+                    " number = excluded.number, text = excluded.text, updated_at = excluded.updated_at",
+                    [(url, sheet_name, number, text, now) for url, sheet_name, number, text in entries],
+                )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    def save(self, url: str, sheet_name: str, number: str, text: str):
+        self.save_many([(url, sheet_name, number, text)])
+
+    def get(self, url: str):
+        """Return {sheet_name, number, text} for a URL, or None."""
+        with store_timer("job_store", "get"), self._lock:
+            row = self._db().execute(
+                "SELECT sheet_name, number, text FROM jobs WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"sheet_name": row[0], "number": row[1], "text": row[2]}
+
+
+job_store = JobStore(JOB_STORE_PATH)
@@ -1,155 +1,267 @@
 # ---- Jobs save/load endpoints ----
 from fastapi import Body, APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
 import os, json
+import asyncio
+import anyio
+import zipfile
 from datetime import datetime
-import time
+from batch_engine import batch_engine, sheet_numbers, customized_sheets
+from render_pool import render_backend, render_export_item, RENDER_WORKERS
+from resume_api import resume_store
+from job_store import job_store
+from tracing import trace
 
 jobs_router = APIRouter(prefix="/jobs", tags=["Jobs"])
 
-INDEX_PATH = os.path.join("data", "jobs", "index.json")
-
-def _ensure_dir(path: str):
-    os.makedirs(path, exist_ok=True)
-
-def _read_index() -> dict:
-    if os.path.exists(INDEX_PATH):
-        with open(INDEX_PATH, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except Exception:
-                return {}
-    return {}
+def _parse_job(payload: dict):
+    url = payload.get("url", "").strip()
+    number = str(payload.get("number", "")).strip()
+    sheet_name = payload.get("sheet_name", "").strip()
+    text = payload.get("text", "")
+    if not url or not number or not sheet_name or not text.strip():
+        return None
+    return url, sheet_name, number, text
 
-def _write_index(data: dict):
-    _ensure_dir(os.path.dirname(INDEX_PATH))
-    with open(INDEX_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+async def _write_job_file(sheet_name: str, number: str, text: str) -> str:
+    base_dir = anyio.Path("data", "jobs", sheet_name, number)
+    await base_dir.mkdir(parents=True, exist_ok=True)
+    file_path = base_dir / "job_description.txt"
+    await file_path.write_text(text, encoding="utf-8")
+    return str(file_path)
 
 @jobs_router.post("/save")
-def save_job_description(payload: dict = Body(...)):
+async def save_job_description(payload: dict = Body(...)):
     """
     Save a job description for a given sheet name and link number.
     Body: { "url": str, "number": int, "sheet_name": str, "text": str }
     """
-    url = payload.get("url", "").strip()
-    number = str(payload.get("number", "")).strip()
-    sheet_name = payload.get("sheet_name", "").strip()
-    text = payload.get("text", "")
-
-    if not url or not number or not sheet_name or not text.strip():
+    job = _parse_job(payload)
+    if not job:
         return {"error": "Missing url, number, sheet_name, or text"}
+    url, sheet_name, number, text = job
 
-    base_dir = os.path.join("data", "jobs", sheet_name, number)
-    _ensure_dir(base_dir)
+    file_path = await _write_job_file(sheet_name, number, text)
+    await run_in_threadpool(job_store.save, url, sheet_name, number, text)
 
-    file_path = os.path.join(base_dir, "job_description.txt")
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(text)
+    return {"success": True, "path": file_path, "sheet_name": sheet_name, "number": number}
 
-    # Update index
-    index = _read_index()
-    index[url] = {"sheet_name": sheet_name, "number": number}
-    _write_index(index)
+@jobs_router.post("/save_batch")
+async def save_job_descriptions(payload: dict = Body(...)):
+    """
+    Save many job descriptions in one store transaction.
+    Body: { "jobs": [{ "url": str, "number": int, "sheet_name": str, "text": str }, ...] }
+    """
+    jobs, invalid = [], []
+    for i, item in enumerate(payload.get("jobs") or []):
+        job = _parse_job(item)
+        if job:
+            jobs.append(job)
+        else:
+            invalid.append(i)
 
-    return {"success": True, "path": file_path, "sheet_name": sheet_name, "number": number}
+    for url, sheet_name, number, text in jobs:
+        await _write_job_file(sheet_name, number, text)
+    await run_in_threadpool(job_store.save_many, jobs)
+
+    return {"success": True, "saved": len(jobs), "invalid": invalid}
 
 @jobs_router.get("/load")
-def load_job_description(url: str):
+async def load_job_description(url: str):
     """
     Load a previously saved job description by URL.
     Returns { found: bool, text?: str, sheet_name?: str, number?: str }
     """
-    index = _read_index()
-    entry = index.get(url)
+    entry = await run_in_threadpool(job_store.get, url)
     if not entry:
         return {"found": False}
 
-    sheet_name, number = entry.get("sheet_name"), entry.get("number")
-    file_path = os.path.join("data", "jobs", sheet_name, number, "job_description.txt")
-    if not os.path.exists(file_path):
-        return {"found": False}
-
-    with open(file_path, "r", encoding="utf-8") as f:
-        text = f.read()
+    sheet_name, number, text = entry["sheet_name"], entry["number"], entry["text"]
+    if text is None:
+        try:
+            text = await anyio.Path("data", "jobs", sheet_name, number, "job_description.txt").read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return {"found": False}
 
     return {"found": True, "text": text, "sheet_name": sheet_name, "number": number}
 
 @jobs_router.post("/generate_custom_resumes")
-def generate_all_custom_resumes(payload: dict = Body(...)):
+async def generate_all_custom_resumes(payload: dict = Body(...)):
     """
-    Generate customized resumes for all job links that have job_description.txt
+    Start generating customized resumes for all job links that have job_description.txt.
+    Jobs run in the background on the batch engine; pairs that already have a
+    custom_resume.json are skipped. Poll /jobs/batches/{batch_id} for progress.
     Body: { "sheet_name": str, "resume": dict }
+       or { "sheet_name": str, "resume_names": [str] } to fan out saved resumes
+    Add "cover_letters": true to also write cover_letter.txt next to each custom resume.
     """
-
-    from pathlib import Path
     sheet_name = payload.get("sheet_name")
     base_resume = payload.get("resume")
+    resume_names = payload.get("resume_names") or []
 
-    if not sheet_name or not base_resume:
+    if not sheet_name or not (base_resume or resume_names):
         return {"error": "Missing sheet_name or resume"}
 
-    jobs_dir = Path("data") / "jobs" / sheet_name
-    if not jobs_dir.exists():
+    if not await anyio.Path("data", "jobs", sheet_name).is_dir():
         return {"error": f"No jobs found for sheet '{sheet_name}'"}
 
-    all_numbers = sorted(
-        [p.name for p in jobs_dir.iterdir() if p.is_dir()],
-        key=lambda x: int(x)
-    )
+    if resume_names:
+        resumes, missing = [], []
+        for name in resume_names:
+            resume = await resume_store.aget(name)
+            if resume is None:
+                missing.append(name)
+            else:
+                resumes.append(resume)
+        if missing:
+            return {"error": f"Resume not found: {', '.join(missing)}"}
+    else:
+        resumes = [base_resume]
+
+    if not all(r.get("name") for r in resumes):
+        return {"error": "Missing sheet_name or resume"}
+
+    with trace("batch.submit", sheet_name=sheet_name, resumes=len(resumes)) as root:
+        progress = await run_in_threadpool(
+            batch_engine.submit, sheet_name, resumes, cover_letters=bool(payload.get("cover_letters"))
+        )
+        root.set(batch_id=progress["batch_id"], pending=progress["pending_count"], skipped=progress["skipped_count"])
+    return {"success": True, **progress}
+
+@jobs_router.post("/recustomize")
+async def recustomize_resumes(payload: dict = Body(...)):
+    """
+    Patch the custom resumes generated from a saved resume after it changed, re-running
+    only the rewrites of the sections that differ from the version they were derived from.
+    Body: { "resume_name": str, "sheet_name": str (optional, default: every sheet) }
+    Poll /jobs/batches/{batch_id} for the progress of each started batch.
+    """
+    resume_name = payload.get("resume_name")
+    if not resume_name:
+        return {"error": "Missing resume_name"}
+    resume = await resume_store.aget(resume_name)
+    if resume is None:
+        return {"error": f"Resume not found: {resume_name}"}
+
+    sheet_name = payload.get("sheet_name")
+    sheets = [sheet_name] if sheet_name else await run_in_threadpool(customized_sheets, resume.get("name"))
+    with trace("batch.submit", resume=resume_name, sheets=len(sheets), kind="recustomize"):
+        batches = [await run_in_threadpool(batch_engine.submit_recustomize, sheet, resume) for sheet in sheets]
+    return {"success": True, "batches": batches}
+
+@jobs_router.get("/batches")
+async def list_batches():
+    """List known batches, newest first."""
+    return {"batches": await run_in_threadpool(batch_engine.list_batches)}
+
+@jobs_router.get("/batches/{batch_id}")
+async def get_batch_progress(batch_id: str):
+    """Return progress of a batch started by /jobs/generate_custom_resumes."""
+    progress = await run_in_threadpool(batch_engine.progress, batch_id)
+    if not progress:
+        return {"error": "Batch not found"}
+    return progress
 
-    total = len(all_numbers)
-    done = 0
-    generated = []
+class _ZipChunks:
+    """Write-only file object for ZipFile; drained after every entry so the archive is never held in memory."""
 
-    for number in all_numbers:
-        desc_path = jobs_dir / number / "job_description.txt"
-        if not desc_path.exists():
-            continue
+    def __init__(self):
+        self._chunks = []
 
-        text = desc_path.read_text(encoding="utf-8").strip()
-        if not text:
-            continue
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
 
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _export_items(sheet_name: str, names: Optional[List[str]], include_cover_letters: bool) -> list:
+    """(number, name, custom_resume.json path, cover_letter.txt path or None) for every stored custom resume."""
+    items = []
+    for number in sheet_numbers(sheet_name):
+        number_dir = os.path.join("data", "jobs", sheet_name, number)
+        for name in sorted(os.listdir(number_dir)):
+            if names and name not in names:
+                continue
+            resume_path = os.path.join(number_dir, name, "custom_resume.json")
+            if os.path.isfile(resume_path):
+                cover_path = os.path.join(number_dir, name, "cover_letter.txt") if include_cover_letters else None
+                items.append((number, name, resume_path, cover_path))
+    return items
+
+@jobs_router.get("/export_pdfs")
+async def export_sheet_pdfs(
+    sheet_name: str = Query(...),
+    names: Optional[List[str]] = Query(None, description="Only export these resume names"),
+    include_cover_letters: bool = Query(False),
+):
+    """
+    Render every custom_resume.json of a sheet (and cover_letter.txt, if asked) to PDF on
+    the render process pool and stream them back as one ZIP, entry by entry as they finish.
+    """
+    items = await run_in_threadpool(_export_items, sheet_name, names, include_cover_letters)
+    if not items:
+        return {"error": f"No custom resumes found for sheet '{sheet_name}'"}
+
+    async def stream():
+        buffer = _ZipChunks()
+        archive = zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED)
+        queue = iter(items)
+        running = {}
         try:
-            # call /resume/customize internally
-            import requests
-            r = requests.post(
-                "http://93.127.129.105:8000/resume/customize",
-                json={"resume": base_resume, "job_description": text},
-                timeout=180,
-            )
-            r.raise_for_status()
-            custom_resume = r.json()
-            _ensure_dir(jobs_dir / number / base_resume.get("name"))
-            (jobs_dir / number / base_resume.get("name") / "custom_resume.json").write_text(
-                json.dumps(custom_resume, indent=2, ensure_ascii=False), encoding="utf-8"
-            )
-            generated.append(number)
-        except Exception as e:
-            print(f"❌ Failed job #{number}: {e}")
-            continue
-
-        done += 1
-        time.sleep(0.2)  # small delay to reduce model rate limit load
-
-    return {
-        "success": True,
-        "sheet_name": sheet_name,
-        "generated_count": len(generated),
-        "total": total,
-        "generated_numbers": generated,
-    }
+            while True:
+                # Keep only a few renders in flight so finished PDFs don't pile up in memory
+                while len(running) < RENDER_WORKERS * 2:
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    number, name, resume_path, cover_path = item
+                    # Export has its own in-flight cap, so it doesn't count against the /resume/pdf queue limit
+                    future = asyncio.ensure_future(
+                        render_backend.run(render_export_item, resume_path, cover_path, enforce_limit=False)
+                    )
+                    running[future] = (number, name)
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    number, name = running.pop(future)
+                    base = f"{number}/{name.replace(' ', '_')}"
+                    try:
+                        for kind, pdf in future.result():
+                            archive.writestr(f"{base}_{kind}.pdf", pdf)
+                    except Exception as e:
+                        archive.writestr(f"{base}_error.txt", str(e))
+                    yield buffer.drain()
+
+            archive.close()
+            yield buffer.drain()
+        finally:
+            for future in running:
+                future.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={sheet_name.replace(' ', '_')}_resumes.zip"},
+    )
 
 @jobs_router.get("/file/exists")
-def file_exists(path: str = Query(...)):
-    import os
-    return {"exists": os.path.exists(path)}
+async def file_exists(path: str = Query(...)):
+    return {"exists": await anyio.Path(path).exists()}
 
 @jobs_router.get("/file/read_json")
-def file_read_json(path: str = Query(...)):
-    import os, json
-    if not os.path.exists(path):
+async def file_read_json(path: str = Query(...)):
+    try:
+        data = json.loads(await anyio.Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
         return JSONResponse({"error": "File not found"}, status_code=404)
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data
\ No newline at end of file
+    return data
@@ -1,20 +1,187 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Optional
+import asyncio
+import codecs
+import json
 import os
+import anyio
 
 router = APIRouter(prefix="/logs", tags=["Logs"])
 
 LOG_PATH = os.path.join(os.path.dirname(__file__), "../startup.log")
+CHUNK_SIZE = 64 * 1024
+MAX_TAIL_LINES = 100_000
+FOLLOW_POLL_SECONDS = 1.0
 
-@router.get("/startup", response_class=PlainTextResponse)
-async def get_startup_log():
-    """Return the content of startup.log as plain text (viewable in browser)."""
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+def _matches(line: bytes, grep: Optional[bytes]) -> bool:
+    return grep is None or grep in line.lower()
+
+
+def _iter_range(path: str, offset: int, length: Optional[int], grep: Optional[bytes]):
+    """Yield the file from offset (up to length bytes) in chunks, optionally keeping only matching lines."""
+    # Chunks may end inside a multi-byte character: one incremental decoder for the whole response
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(path, "rb") as f:
+        f.seek(offset)
+        remaining = length
+        carry = b""
+        while remaining is None or remaining > 0:
+            chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            if grep is None:
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+                continue
+            lines = (carry + chunk).split(b"\n")
+            carry = lines.pop()
+            matched = [line for line in lines if _matches(line, grep)]
+            if matched:
+                yield _decode(b"\n".join(matched) + b"\n")
+        if carry and _matches(carry, grep):
+            yield _decode(carry)
+    if grep is None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def _reverse_lines(f, end: int):
+    """Yield the lines before byte position `end`, last line first, reading backwards in blocks."""
+    pos = end
+    carry = b""
+    while pos > 0:
+        read = min(CHUNK_SIZE, pos)
+        pos -= read
+        f.seek(pos)
+        lines = (f.read(read) + carry).split(b"\n")
+        carry = lines.pop(0)
+        for line in reversed(lines):
+            yield line
+    yield carry
+
+
+def _tail(path: str, n: int, grep: Optional[bytes]) -> tuple:
+    """Return (last n lines matching grep, file size) without reading the whole file."""
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        lines = []
+        reverse = _reverse_lines(f, size)
+        # A trailing newline leaves an empty last "line"
+        first = next(reverse, None)
+        if first and _matches(first, grep):
+            lines.append(first)
+        for line in reverse:
+            if len(lines) >= n:
+                break
+            if _matches(line, grep):
+                lines.append(line)
+    lines.reverse()
+    return lines, size
+
+
+def _read_appended(path: str, pos: int, carry: bytes, grep: Optional[bytes]) -> tuple:
+    """
+    Read the next chunk written after pos.
+    Returns (new pos, unfinished last line, matching lines, rotated, more to read).
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    rotated = size < pos
+    if rotated:
+        # File was truncated or rotated → start over from the top
+        pos, carry = 0, b""
+    if size <= pos:
+        return pos, carry, [], rotated, False
+    with open(path, "rb") as f:
+        f.seek(pos)
+        chunk = f.read(min(CHUNK_SIZE, size - pos))
+    pos += len(chunk)
+    lines = (carry + chunk).split(b"\n")
+    carry = lines.pop()
+    return pos, carry, [line for line in lines if _matches(line, grep)], rotated, pos < size
+
+
+async def _follow(path: str, start: int, grep: Optional[bytes], initial: list):
+    """Server-sent events: send the initial lines, then every new line appended to the file."""
+    for line in initial:
+        yield f"data: {json.dumps(_decode(line))}\n\n"
+
+    pos = start
+    carry = b""
+    while True:
+        # File reads run on a worker thread, never on the event loop
+        pos, carry, lines, rotated, more = await anyio.to_thread.run_sync(_read_appended, path, pos, carry, grep)
+        if rotated:
+            yield "event: rotated\ndata: {}\n\n"
+        for line in lines:
+            yield f"data: {json.dumps(_decode(line))}\n\n"
+        if more:
+            continue
+        if not lines:
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(FOLLOW_POLL_SECONDS)
+
+
+@router.get("/startup")
+async def get_startup_log(
+    tail: Optional[int] = Query(None, ge=1, le=MAX_TAIL_LINES, description="Return only the last N lines"),
+    offset: Optional[int] = Query(None, ge=0, description="Byte offset to start reading from"),
+    length: Optional[int] = Query(None, ge=1, description="Max number of bytes to read from offset"),
+    grep: Optional[str] = Query(None, description="Keep only lines containing this text (case-insensitive)"),
+    follow: bool = Query(False, description="Stream new lines as server-sent events"),
+):
+    """
+    Return the content of startup.log as plain text (viewable in browser).
+    The file is streamed in chunks, so memory use doesn't depend on its size.
+    """
     if not os.path.exists(LOG_PATH):
         raise HTTPException(status_code=404, detail="Log file not found")
 
+    needle = grep.lower().encode("utf-8") if grep else None
+
     try:
-        with open(LOG_PATH, "r", encoding="utf-8") as f:
-            content = f.read()
-        return PlainTextResponse(content, media_type="text/plain; charset=utf-8")
+        if follow:
+            if tail:
+                initial, size = await run_in_threadpool(_tail, LOG_PATH, tail, needle)
+            else:
+                initial, size = [], os.path.getsize(LOG_PATH)
+            return StreamingResponse(
+                _follow(LOG_PATH, size, needle, initial),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
+        if tail:
+            lines, size = await run_in_threadpool(_tail, LOG_PATH, tail, needle)
+            content = _decode(b"\n".join(lines) + (b"\n" if lines else b""))
+            return PlainTextResponse(
+                content,
+                media_type="text/plain; charset=utf-8",
+                headers={"X-Log-Size": str(size)},
+            )
+
+        size = os.path.getsize(LOG_PATH)
+        start = min(offset or 0, size)
+        end = size if length is None else min(size, start + length)
+        return StreamingResponse(
+            _iter_range(LOG_PATH, start, end - start, needle),
+            media_type="text/plain; charset=utf-8",
+            headers={"X-Log-Size": str(size), "X-Next-Offset": str(end)},
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading log file: {e}")
@@ -1,53 +1,66 @@
-from fastapi import FastAPI, Query, Request, HTTPException
+from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import requests
-import csv
-from bs4 import BeautifulSoup
+import asyncio
+import json
+from typing import List, Optional
+from urllib.parse import urlsplit
 import os
 from pydantic import BaseModel
 from resume_api import router as resume_router
 from log_api import router as log_router
 from jobs_api import jobs_router
+from resume_api import resume_store
+from batch_engine import batch_engine
+from counters import counter_store
+from http_client import http_client
+from html_extract import parse_page, scrape_streaming
+from sheet_cache import sheet_cache
+from render_pool import render_backend
+from metrics_api import metrics_router
+from metrics import MetricsMiddleware
+from auth import AuthMiddleware, auth_log_listener
+from tracing import trace_log
+from rate_limiter import model_limiter
+from singleflight import AsyncSingleFlight, normalize_text
+from token_budget import estimate_tokens
 from dotenv import load_dotenv
 import uvicorn
 from fastapi.middleware import Middleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from anyio.from_thread import BlockingPortal
 
 load_dotenv()
 
 APP_SECRET_KEY = os.getenv("APP_SECRET_KEY", "defaultkey")
 ALLOWED_FRONTEND = os.getenv("ALLOWED_FRONTEND_URL", "http://93.127.129.105:3001/schedules/ammar").rstrip("/")
 
-app = FastAPI(title="Google Sheet Link Extractor")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    auth_log_listener.start()
+    trace_log.start()
+    await http_client.start()
+    async with BlockingPortal() as portal:
+        # The batch engine's threads run the model pipeline on this event loop
+        batch_engine.use_portal(portal)
+        # Pick up batches that were still running when the server stopped
+        batch_engine.resume_unfinished()
+        # POST /resume/?recustomize=true patches the custom resumes derived from the saved one
+        resume_store.add_listener(batch_engine.on_resume_saved)
+        yield
+        batch_engine.shutdown()
+        await portal.stop(cancel_remaining=True)
+    counter_store.flush()
+    render_backend.shutdown()
+    await http_client.close()
+    trace_log.stop()
+    auth_log_listener.stop()
 
-@app.middleware("http")
-async def verify_api_key(request: Request, call_next):
-    try:
-        key = request.headers.get("X-Auth-Key")
-        referer = (request.headers.get("X-Frontend-Source") or "").rstrip("/")
-
-        print(ALLOWED_FRONTEND)
-        print(referer)
-
-        # --- 1️⃣ If auth key is correct → allow everything
-        if key and key == APP_SECRET_KEY:
-            return await call_next(request)
+app = FastAPI(title="Google Sheet Link Extractor", lifespan=lifespan)
 
-        # --- 2️⃣ Otherwise, allow only from specific frontend URL
-        if referer == ALLOWED_FRONTEND:
-            return await call_next(request)
-
-        # --- 3️⃣ Otherwise block
-        return JSONResponse(
-            status_code=403,
-            content={"detail": f"Forbidden: Invalid auth key or referer ({referer}, {ALLOWED_FRONTEND})"},
-        )
-
-    except Exception as e:
-        return JSONResponse(
-            status_code=500,
-            content={"detail": f"Internal Server Error: {str(e)}"},
-        )
+# Checks X-Auth-Key / X-Frontend-Source; inside CORS so preflight requests never need a key
+app.add_middleware(AuthMiddleware, keys=[APP_SECRET_KEY], allowed_frontends=[ALLOWED_FRONTEND])
 
 # Allow frontend access (React dev server)
 app.add_middleware(
@@ -63,75 +76,152 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost: times every request, rejected ones included
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(resume_router)
 app.include_router(jobs_router)
 app.include_router(log_router)
+app.include_router(metrics_router)
 
-def fetch_links_from_sheet(sheet_url: str, sheet_name: str):
-    """Fetch all links from a public Google Sheet."""
-    sheet_id = sheet_url.split("/d/")[1].split("/")[0]
-    export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
-    response = requests.get(export_url)
-    response.raise_for_status()
-
-    decoded = response.content.decode("utf-8").splitlines()
-    reader = csv.reader(decoded)
-
-    # Extract only first-column links (normalize)
-    links = []
-    for row in reader:
-        if not row:
-            continue
-        val = row[0].strip()
-        if val.startswith("http"):
-            links.append(val)
-        else:
-            import re
-            match = re.search(r"https://[^\s]+", val)
-            if match:
-                links.append(match.group(0))
-    return links
+def _sheet_id(sheet_url: str) -> str:
+    return sheet_url.split("/d/")[1].split("/")[0]
+
+async def fetch_links_from_sheet(sheet_url: str, sheet_name: str):
+    """Fetch all links from a public Google Sheet (cached, revalidated after SHEET_CACHE_TTL)."""
+    entry = await sheet_cache.get(_sheet_id(sheet_url), sheet_name)
+    return list(entry.links)
 
 @app.get("/extract")
-def extract_links(sheet_url: str = Query(...), sheet_name: str = Query(...)):
-    """API endpoint to extract links."""
+async def extract_links(
+    sheet_url: str = Query(...),
+    sheet_name: str = Query(...),
+    since: Optional[int] = Query(None, ge=0, description="Only return links added after this cursor"),
+    fresh: bool = Query(False, description="Revalidate with Google even if the cached copy is recent"),
+):
+    """
+    API endpoint to extract links.
+    Returns a cursor; pass it back as `since` to get only the links added since then.
+    A cursor the cache no longer knows (restart, eviction) returns every link with "reset": true.
+    """
     try:
-        links = fetch_links_from_sheet(sheet_url, sheet_name)
-        return {"count": len(links), "links": links}
+        entry = await sheet_cache.get(_sheet_id(sheet_url), sheet_name, fresh=fresh)
+        if since is None:
+            return {"count": len(entry.links), "links": list(entry.links), "cursor": entry.cursor}
+        if not sheet_cache.is_known_cursor(entry, since):
+            return {
+                "count": len(entry.links),
+                "links": list(entry.links),
+                "total": len(entry.links),
+                "cursor": entry.cursor,
+                "since": since,
+                "reset": True,
+            }
+        new_links = [link for link in entry.links if entry.seen.get(link, 0) > since]
+        return {
+            "count": len(new_links),
+            "links": new_links,
+            "total": len(entry.links),
+            "cursor": entry.cursor,
+            "since": since,
+        }
     except Exception as e:
         return {"error": str(e)}
 
-@app.get("/scrape")
-def scrape_url(url: str = Query(...)):
-    """Scrape the given URL and return title + meta description + first paragraph."""
+SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0 Safari/537.36"
+}
+
+# "stream": stop downloading once the fields are found (bounded), "full": parse the whole page
+SCRAPE_MODE = os.getenv("SCRAPE_MODE", "stream")
+
+async def scrape_one(url: str, mode: str = None) -> dict:
+    """Fetch one page and return title + meta description + first paragraph (or an error)."""
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/120.0 Safari/537.36"
-        }
-        res = requests.get(url, headers=headers, timeout=10)
+        if (mode or SCRAPE_MODE) == "stream":
+            return await scrape_streaming(url, headers=SCRAPE_HEADERS, timeout=10)
+        res = await http_client.get(url, headers=SCRAPE_HEADERS, timeout=10)
         res.raise_for_status()
-        soup = BeautifulSoup(res.text, "html.parser")
+        # HTML parsing is CPU-bound → keep it off the event loop
+        return await run_in_threadpool(parse_page, res.text)
+    except Exception as e:
+        return {"error": str(e)}
 
-        title = soup.title.string.strip() if soup.title else "No title found"
-        meta_desc = ""
-        meta = soup.find("meta", attrs={"name": "description"})
-        if meta and meta.get("content"):
-            meta_desc = meta["content"].strip()
+@app.get("/scrape")
+async def scrape_url(url: str = Query(...), mode: Optional[str] = Query(None, pattern="^(stream|full)$")):
+    """Scrape the given URL and return title + meta description + first paragraph."""
+    return await scrape_one(url, mode)
 
-        first_p = ""
-        p = soup.find("p")
-        if p:
-            first_p = p.get_text(strip=True)
+SCRAPE_BATCH_CONCURRENCY = int(os.getenv("SCRAPE_BATCH_CONCURRENCY", "32"))
+SCRAPE_PER_DOMAIN_LIMIT = int(os.getenv("SCRAPE_PER_DOMAIN_LIMIT", "2"))
+SCRAPE_BATCH_MAX_URLS = int(os.getenv("SCRAPE_BATCH_MAX_URLS", "2000"))
 
-        return {
-            "title": title,
-            "description": meta_desc or "No meta description found",
-            "snippet": first_p or "No paragraph found",
-        }
+# Politeness: how many pages of one domain are fetched at the same time, across all batches.
+# domain -> [semaphore, tasks holding or waiting for it]; dropped once nobody uses it
+_scrape_domain_slots = {}
+
+@asynccontextmanager
+async def _domain_slot(url: str):
+    domain = urlsplit(url).netloc.lower()
+    slot = _scrape_domain_slots.get(domain)
+    if slot is None:
+        slot = _scrape_domain_slots[domain] = [asyncio.Semaphore(SCRAPE_PER_DOMAIN_LIMIT), 0]
+    slot[1] += 1
+    try:
+        async with slot[0]:
+            yield
+    finally:
+        slot[1] -= 1
+        if not slot[1]:
+            del _scrape_domain_slots[domain]
+
+class ScrapeBatch(BaseModel):
+    urls: Optional[List[str]] = None
+    sheet_url: Optional[str] = None
+    sheet_name: Optional[str] = None
+
+@app.post("/scrape/batch")
+async def scrape_batch(batch: ScrapeBatch):
+    """
+    Scrape many URLs concurrently and stream results back as NDJSON, one line per URL
+    in completion order: {"index", "url", "title", "description", "snippet"} or {"index", "url", "error"}.
+    Pass either urls, or sheet_url + sheet_name to scrape every link of a sheet.
+    The last line is {"done": true, "count": n}.
+    """
+    try:
+        urls = list(batch.urls or [])
+        if not urls and batch.sheet_url and batch.sheet_name:
+            urls = await fetch_links_from_sheet(batch.sheet_url, batch.sheet_name)
     except Exception as e:
         return {"error": str(e)}
+    if not urls:
+        return {"error": "Missing urls or sheet_url + sheet_name"}
+    if len(urls) > SCRAPE_BATCH_MAX_URLS:
+        return {"error": f"Too many urls (max {SCRAPE_BATCH_MAX_URLS})"}
+
+    limit = asyncio.Semaphore(SCRAPE_BATCH_CONCURRENCY)
+
+    async def run(index: int, url: str) -> dict:
+        # Wait for the domain first: a batch slot is only taken once the page can be fetched,
+        # so a crowd of links to one domain doesn't starve the others
+        async with _domain_slot(url), limit:
+            result = await scrape_one(url)
+        return {"index": index, "url": url, **result}
+
+    async def stream():
+        tasks = [asyncio.create_task(run(i, url)) for i, url in enumerate(urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True, "count": len(urls)}) + "\n"
+        finally:
+            # Client went away → don't keep scraping for nobody
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_URL = os.getenv("MODEL_URL")
@@ -140,8 +230,10 @@ MODEL_NAME = os.getenv("MODEL_NAME")
 class JobPost(BaseModel):
     text: str
 
+analyze_flights = AsyncSingleFlight("analyze_job")
+
 @app.post("/analyze_job")
-def analyze_job(post: JobPost):
+async def analyze_job(post: JobPost):
     """Analyze job post text via GitHub Models API and extract structured fields."""
     try:
         headers = {
@@ -171,11 +263,22 @@ def analyze_job(post: JobPost):
         }
 
         url = MODEL_URL
-        r = requests.post(url, headers=headers, json=payload, timeout=30)
-        r.raise_for_status()
-        data = r.json()
 
-        print(data)
+        async def post_model():
+            r = await http_client.post(url, headers=headers, json=payload, timeout=30)
+            r.raise_for_status()
+            return r.json()
+
+        # Operators opening the same post at once share one model call
+        data, _ = await analyze_flights.do(
+            normalize_text(post.text),
+            lambda: model_limiter.call(
+                post_model,
+                kind="analyze_job",
+                estimated_tokens=sum(estimate_tokens(m["content"]) for m in payload["messages"]),
+                usage=lambda data: data.get("usage"),
+            ),
+        )
 
         content = data["choices"][0]["message"]["content"]
         return {"result": content}
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+from http_client import http_client
+from sheet_cache import sheet_cache
+from render_pool import render_backend
+from rate_limiter import model_limiter
+from singleflight import flight_groups
+from metrics import registry
+from tracing import trace_log
+
+metrics_router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@registry.collector
+def _pool_gauges():
+    """Point-in-time load of the pools that keep their own counters."""
+    pdf = render_backend.stats()
+    model = model_limiter.stats()
+    samples = [
+        ("pdf_renders_in_flight", "Renders running or waiting for a pool worker.", "gauge", None, pdf["in_flight"]),
+        ("pdf_renders_rejected_total", "Renders refused because the queue was full.", "counter", None, pdf["rejected"]),
+        ("model_rate_limited_total", "429 responses from the model API.", "counter", None, model["rate_limited"]),
+        ("model_limiter_paused_seconds", "Time left on the shared 429 back-off.", "gauge", None, model["paused_for_s"]),
+    ]
+    for name, group in flight_groups.items():
+        stats = group.stats()
+        samples.append(("singleflight_shared_total", "Calls joined onto one already in flight.", "counter", {"group": name}, stats["shared"]))
+    return samples
+
+@metrics_router.get("", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    """Prometheus text exposition: per-route HTTP latency, model calls per prompt type, PDF renders, store timings."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@metrics_router.get("/http")
+def get_http_metrics():
+    """Connection pool usage of the shared outbound HTTP client."""
+    return http_client.stats()
+
+@metrics_router.get("/sheets")
+def get_sheet_cache_metrics():
+    """Hit / revalidation / download counters of the Google Sheet link cache."""
+    return sheet_cache.stats()
+
+@metrics_router.get("/pdf")
+def get_pdf_render_metrics():
+    """Render pool load and per-render timings (render time vs time waiting for a worker)."""
+    return render_backend.stats()
+
+@metrics_router.get("/model")
+def get_model_limiter_metrics():
+    """Shared model rate limiter: time queued for RPM/TPM budget vs time in the model call, retries, 429s."""
+    return model_limiter.stats()
+
+@metrics_router.get("/singleflight")
+def get_singleflight_metrics():
+    """Identical model requests joined onto a call already in flight, per call site."""
+    return {name: group.stats() for name, group in flight_groups.items()}
+
+@metrics_router.get("/traces")
+def get_slow_traces(
+    limit: int = Query(10, ge=1, le=200),
+    name: str = Query(None, description="customize, coverletter, pdf, batch.submit, batch.extract or batch.rewrite"),
+):
+    """Slowest recent traces over TRACE_SLOW_MS, each with its stage-by-stage breakdown."""
+    return {**trace_log.stats(), "traces": trace_log.slowest(limit, name)}
@@ -0,0 +1,132 @@
+# ---- Persistent model response cache ----
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import anyio
+
+from metrics import store_timer
+
+MODEL_CACHE_PATH = os.getenv("MODEL_CACHE_PATH", os.path.join("data", "cache", "model_cache.sqlite3"))
+MODEL_CACHE_MAX_ENTRIES = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "5000"))
+MODEL_CACHE_TTL = int(os.getenv("MODEL_CACHE_TTL", str(7 * 24 * 3600)))  # seconds, 0 = never expire
+MODEL_CACHE_ENABLED = os.getenv("MODEL_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+class ModelCache:
+    """
+    Content-addressed cache of model responses stored in SQLite.
+    Entries are keyed by sha256(model, system prompt, user input), evicted
+    least-recently-used once max_entries is exceeded and expired after ttl seconds.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_content: str) -> str:
+        h = hashlib.sha256()
+        for part in (model or "", system_prompt, user_content):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with store_timer("model_cache", "get"), self._lock:
+            db = self._db()
+            row = db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with store_timer("model_cache", "set"), self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict(db, now)
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        if self.ttl:
+            cur = db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self.expired += cur.rowcount
+        (count,) = db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    # --- Async wrappers: the SQLite work (and the wait for the lock the batch threads
+    # also take) runs on a worker thread, never on the event loop ---
+    async def aget(self, key: str):
+        return await anyio.to_thread.run_sync(self.get, key)
+
+    async def aset(self, key: str, value: str):
+        await anyio.to_thread.run_sync(self.set, key, value)
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._db().execute("SELECT COUNT(*) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "enabled": MODEL_CACHE_ENABLED,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+
+model_cache = ModelCache(MODEL_CACHE_PATH, MODEL_CACHE_MAX_ENTRIES, MODEL_CACHE_TTL)
@@ -0,0 +1,260 @@
+# ---- Resume PDF renderer with prebuilt styles and a render cache ----
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, HRFlowable,
+    ListFlowable, ListItem
+)
+
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "128"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+STYLE_IDS = range(1, 8)
+
+STYLE_VARIANTS = {
+    1: dict(font="Helvetica", accent=colors.HexColor("#007bff"), line_thickness=0.6),
+    2: dict(font="Courier", accent=colors.HexColor("#ff6600"), line_thickness=1.0),
+    3: dict(font="Times-Roman", accent=colors.HexColor("#28a745"), line_thickness=0.8),
+    4: dict(font="Helvetica-Oblique", accent=colors.HexColor("#6610f2"), line_thickness=0.7),
+    5: dict(font="Times-Italic", accent=colors.HexColor("#16a085"), line_thickness=0.5),
+    6: dict(font="Helvetica-Bold", accent=colors.HexColor("#dc3545"), line_thickness=0.9),
+    7: dict(font="Helvetica", accent=colors.HexColor("#17a2b8"), line_thickness=0.6),
+}
+
+
+def apply_style_variant(style_id: int):
+    """Return color, font, and layout settings based on style_id."""
+    return STYLE_VARIANTS.get(style_id, STYLE_VARIANTS[7])
+
+
+def _build_style_set(style_id: int) -> dict:
+    style = apply_style_variant(style_id)
+    return {
+        "variant": style,
+        "name": ParagraphStyle(
+            "name",
+            fontName=style["font"],
+            fontSize=20,
+            leading=24,
+            spaceAfter=8,
+            textColor=style["accent"]
+        ),
+        "title": ParagraphStyle("title", fontName="Helvetica-Oblique", fontSize=11.5, leading=14, spaceAfter=10),
+        "p": ParagraphStyle("p", fontName=style["font"], fontSize=10.5, leading=14),
+        "section": ParagraphStyle("h2", fontName="Helvetica-Bold", fontSize=13.5, leading=16, spaceBefore=12, spaceAfter=6, textColor=style["accent"]),
+        "bullet": ParagraphStyle("bullet", fontName=style["font"], fontSize=10.5, leading=14, leftIndent=14),
+        "letter": ParagraphStyle("letter", fontName=style["font"], fontSize=10.5, leading=14, spaceAfter=10),
+    }
+
+
+# --- Built once at import: ParagraphStyles are read-only during layout ---
+STYLE_SETS = {style_id: _build_style_set(style_id) for style_id in STYLE_IDS}
+
+_BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+_ESCAPE_BR = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", "\n": "<br/>"})
+
+
+def markdown_to_markup(text: str, line_breaks: bool = False) -> str:
+    """
+    Single pass from Markdown-style bold (**text**) to reportlab paragraph markup:
+    text is escaped, bold spans become <b>..</b> and, with line_breaks, newlines become <br/>.
+    """
+    if not text:
+        return ""
+    table = _ESCAPE_BR if line_breaks else _ESCAPE
+    parts = []
+    last = 0
+    for m in _BOLD_RE.finditer(text):
+        parts.append(text[last:m.start()].translate(table))
+        parts.append("<b>" + m.group(1).translate(table) + "</b>")
+        last = m.end()
+    parts.append(text[last:].translate(table))
+    return "".join(parts)
+
+
+def resume_hash(resume: dict) -> str:
+    return hashlib.sha256(json.dumps(resume, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def deterministic_style(digest: str) -> int:
+    """Pick one of the 7 styles from the resume hash, so the same resume always gets the same look."""
+    return int(digest[:8], 16) % len(STYLE_IDS) + 1
+
+
+def _new_document(buffer: BytesIO) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=40, leftMargin=40, topMargin=50, bottomMargin=50
+    )
+
+
+def _header_story(resume: dict, styles: dict) -> list:
+    """Name, role, contact line and LinkedIn link, closed by an accent rule."""
+    style = styles["variant"]
+    st_name, st_title, st_p = styles["name"], styles["title"], styles["p"]
+    story = []
+    story.append(Paragraph(html.escape(resume.get("name") or ""), st_name))
+    story.append(Spacer(1, 4))
+    story.append(Paragraph(html.escape(resume.get("role_name") or ""), st_title))
+    contact = " | ".join(
+        [x for x in [resume.get("email"), resume.get("phone"), resume.get("address")] if x]
+    )
+    if contact:
+        story.append(Paragraph(html.escape(contact), st_p))
+    linkedin = resume.get("linkedin")
+    if linkedin:
+        story.append(Paragraph(f"<a href='{html.escape(linkedin)}'>{html.escape(linkedin)}</a>", st_p))
+    story.append(Spacer(1, 10))
+    story.append(HRFlowable(
+        width="100%",
+        color=style["accent"],
+        thickness=style["line_thickness"],
+        spaceBefore=6,
+        spaceAfter=10
+    ))
+    return story
+
+
+def render_pdf_bytes(resume: dict, style_id: int) -> bytes:
+    """Lay out a resume (plain dict, see resume_api.Resume) as a PDF in the given style."""
+    styles = STYLE_SETS.get(style_id, STYLE_SETS[7])
+    st_p, st_section, st_bullet = styles["p"], styles["section"], styles["bullet"]
+
+    buffer = BytesIO()
+    doc = _new_document(buffer)
+
+    # --- Header ---
+    story = _header_story(resume, styles)
+
+    # --- Profile Summary ---
+    if resume.get("profile_summary"):
+        story.append(Paragraph("Profile Summary", st_section))
+        story.append(Paragraph(markdown_to_markup(resume["profile_summary"], line_breaks=True), st_p))
+
+    # --- Education ---
+    if resume.get("education"):
+        story.append(Paragraph("Education", st_section))
+        for edu in resume["education"]:
+            text = (
+                f"<b>{html.escape(edu['degree'])}</b> — {html.escape(edu['university'])} "
+                f"({html.escape(edu['from_year'])}–{html.escape(edu['to_year'])})"
+                f"<br/>{html.escape(edu['location'])}"
+            )
+            story.append(Paragraph(text, st_p))
+            story.append(Spacer(1, 4))
+
+    # --- Experience ---
+    if resume.get("experience"):
+        story.append(Paragraph("Professional Experience", st_section))
+        for exp in resume["experience"]:
+            story.append(Paragraph(
+                f"<b>{html.escape(exp['role'])}</b> — {html.escape(exp['company'])} "
+                f"({html.escape(exp['from_date'])}–{html.escape(exp['to_date'])})", st_p))
+            if exp.get("location"):
+                story.append(Paragraph(html.escape(exp["location"]), st_p))
+            story.append(Spacer(1, 4))
+
+            # --- Responsibilities with bullet points ---
+            bullets = [
+                b.strip("•-\u2022\t ") for b in (exp.get("responsibilities") or "").splitlines() if b.strip()
+            ]
+            if bullets:
+                story.append(ListFlowable(
+                    [ListItem(Paragraph(markdown_to_markup(line), st_bullet)) for line in bullets],
+                    bulletType="bullet",
+                    bulletFontName="Helvetica",
+                    bulletFontSize=8.5,
+                    leftIndent=10,
+                    bulletIndent=0
+                ))
+            story.append(Spacer(1, 8))
+
+    # --- Skills ---
+    if resume.get("skills"):
+        story.append(Paragraph("Skills", st_section))
+        story.append(Paragraph(markdown_to_markup(resume["skills"], line_breaks=True), st_p))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+
+def render_cover_letter_bytes(resume: dict, text: str, style_id: int) -> bytes:
+    """
+    Lay out a cover letter under the resume's contact header, in the resume's style:
+    one paragraph per blank-line separated block, no section headings.
+    """
+    styles = STYLE_SETS.get(style_id, STYLE_SETS[7])
+    st_letter = styles["letter"]
+    buffer = BytesIO()
+    doc = _new_document(buffer)
+
+    story = _header_story(resume, styles)
+    for block in re.split(r"\n\s*\n", text.strip()):
+        if block.strip():
+            story.append(Paragraph(markdown_to_markup(block.strip(), line_breaks=True), st_letter))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+class PdfCache:
+    """LRU of rendered PDFs keyed by (resume hash, style_id), bounded by entries and total bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key: tuple, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = data
+            self._bytes += len(data)
+            while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+pdf_cache = PdfCache(PDF_CACHE_MAX_ENTRIES, PDF_CACHE_MAX_BYTES)
+
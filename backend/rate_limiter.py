@@ -0,0 +1,268 @@
+# ---- Shared rate limiter and retry policy for model calls ----
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+import openai
+
+from metrics import MODEL_CALLS, MODEL_IN_FLIGHT, MODEL_LATENCY, MODEL_QUEUE_WAIT, MODEL_TOKENS, latency_summary
+from tracing import add_event
+
+MODEL_RPM = int(os.getenv("MODEL_RPM", "60"))  # requests per minute, 0 = unlimited
+MODEL_TPM = int(os.getenv("MODEL_TPM", "0"))  # tokens per minute, 0 = unlimited
+MODEL_MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", "5"))
+MODEL_RETRY_BASE = float(os.getenv("MODEL_RETRY_BASE", "1"))  # seconds
+MODEL_RETRY_MAX = float(os.getenv("MODEL_RETRY_MAX", "30"))  # seconds
+# Completion tokens charged up front for a call; corrected once the real usage is known
+MODEL_COMPLETION_ESTIMATE = int(os.getenv("MODEL_COMPLETION_ESTIMATE", "500"))
+LIMITER_TIMINGS_WINDOW = 500
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class _Bucket:
+    """
+    Token bucket that may go into debt: a caller takes its tokens right away and
+    waits until the debt is paid back, so waiters are served in arrival order.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def refill(self, elapsed: float):
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def take(self, cost: float) -> float:
+        """Take cost tokens and return the seconds until the bucket is out of debt."""
+        self.tokens -= min(cost, self.capacity)
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+def _status_of(error: Exception):
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return isinstance(error, openai.RateLimitError) or _status_of(error) == 429
+
+
+def is_retryable(error: Exception) -> bool:
+    if is_rate_limited(error):
+        return True
+    if isinstance(error, (openai.APIConnectionError, httpx.TransportError)):
+        return True
+    return _status_of(error) in RETRYABLE_STATUS
+
+
+def token_counts(usage) -> tuple:
+    """(prompt, completion, total) tokens from an SDK usage object or a raw API usage dict."""
+    if usage is None:
+        return 0, 0, 0
+    get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+    prompt = get("prompt_tokens") or 0
+    completion = get("completion_tokens") or 0
+    return prompt, completion, get("total_tokens") or prompt + completion
+
+
+def retry_after_seconds(error: Exception):
+    """Server-suggested wait from retry-after-ms / retry-after headers, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None  # HTTP-date form: fall back to our own backoff
+    return None
+
+
+def retry_delay(attempt: int, error: Exception) -> float:
+    """Retry-After plus a little jitter when the server gives one, else full-jitter exponential backoff."""
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        return min(MODEL_RETRY_MAX, retry_after) + random.uniform(0, MODEL_RETRY_BASE)
+    return random.uniform(0, min(MODEL_RETRY_MAX, MODEL_RETRY_BASE * 2 ** attempt))
+
+
+class ModelRateLimiter:
+    """
+    Requests/min and tokens/min buckets shared by every model caller (resume
+    customization, cover letters, analyze_job, the batch engine). A 429 pauses the
+    whole limiter for the Retry-After period; callers leave the pause spread out by
+    jitter instead of all at once. Callers await; the batch engine's threads reach it
+    through the event loop too.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._lock = threading.Lock()
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.in_flight = 0
+        self._wait_seconds = deque(maxlen=LIMITER_TIMINGS_WINDOW)
+        self._model_seconds = deque(maxlen=LIMITER_TIMINGS_WINDOW)
+        self._by_kind = {}
+
+    def _reserve(self, tokens: int) -> float:
+        """Charge one request and `tokens` tokens; return how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = 0.0
+            for bucket, cost in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket.enabled:
+                    bucket.refill(elapsed)
+                    wait = max(wait, bucket.take(cost))
+            if self._paused_until > now:
+                wait = max(wait, self._paused_until - now + random.uniform(0, MODEL_RETRY_BASE))
+            return wait
+
+    def _settle(self, estimated: int, actual: int):
+        """Correct the token bucket once the real usage of a call is known."""
+        if actual and self._tokens.enabled:
+            with self._lock:
+                self._tokens.tokens -= actual - estimated
+
+    def _pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _record(self, kind: str, waited: float, model_seconds: float = None, outcome: str = "ok", error: str = None):
+        with self._lock:
+            stats = self._by_kind.setdefault(kind, {"calls": 0, "retries": 0, "rate_limited": 0, "failed": 0})
+            if outcome == "ok":
+                self.calls += 1
+                stats["calls"] += 1
+            elif outcome == "retry":
+                self.retries += 1
+                stats["retries"] += 1
+            else:
+                self.failed += 1
+                stats["failed"] += 1
+            self._wait_seconds.append(waited)
+            if model_seconds is not None:
+                self._model_seconds.append(model_seconds)
+        MODEL_CALLS.inc(kind=kind, outcome=outcome)
+        MODEL_QUEUE_WAIT.observe(waited, kind=kind)
+        if model_seconds is not None:
+            MODEL_LATENCY.observe(model_seconds, kind=kind)
+        add_event(
+            "attempt",
+            outcome=outcome,
+            queue_wait_ms=round(waited * 1000, 2),
+            model_ms=round((model_seconds or 0) * 1000, 2),
+            **({"error": error} if error else {}),
+        )
+
+    def _on_success(self, kind: str, cost: int, usage):
+        prompt, completion, total = token_counts(usage)
+        if prompt or completion:
+            MODEL_TOKENS.inc(prompt, kind=kind, type="prompt")
+            MODEL_TOKENS.inc(completion, kind=kind, type="completion")
+        self._settle(cost, total)
+
+    def _enter(self, kind: str):
+        with self._lock:
+            self.in_flight += 1
+        MODEL_IN_FLIGHT.inc(kind=kind)
+
+    def _leave(self, kind: str):
+        with self._lock:
+            self.in_flight -= 1
+        MODEL_IN_FLIGHT.dec(kind=kind)
+
+    def _on_error(self, kind: str, error: Exception, attempt: int):
+        """Return the delay before the next attempt, or None when the error is final."""
+        if attempt >= MODEL_MAX_RETRIES or not is_retryable(error):
+            return None
+        delay = retry_delay(attempt, error)
+        if is_rate_limited(error):
+            with self._lock:
+                self.rate_limited += 1
+                self._by_kind.setdefault(kind, {"calls": 0, "retries": 0, "rate_limited": 0, "failed": 0})
+                self._by_kind[kind]["rate_limited"] += 1
+            # Everyone backs off, not just the caller that hit the limit
+            self._pause(delay)
+        return delay
+
+    async def call(self, fn, *, kind: str = "model", estimated_tokens: int = 0, usage=None):
+        """
+        Await fn() under the limits with retries; waits never block the event loop.
+        usage(result) returns the usage of a result (SDK object, API dict or None); it
+        corrects the token estimate and feeds the per-kind token counters.
+        """
+        cost = estimated_tokens + MODEL_COMPLETION_ESTIMATE if self._tokens.enabled else 0
+        for attempt in range(MODEL_MAX_RETRIES + 1):
+            waited = self._reserve(cost)
+            if waited:
+                await asyncio.sleep(waited)
+            started = time.perf_counter()
+            self._enter(kind)
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._on_error(kind, e, attempt)
+                self._record(
+                    kind, waited, time.perf_counter() - started,
+                    "retry" if delay is not None else "failed", _describe(e, delay),
+                )
+                if delay is None:
+                    raise
+                print(f"⚠️ Model call failed ({e.__class__.__name__}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                self._leave(kind)
+            self._record(kind, waited, time.perf_counter() - started)
+            if usage is not None:
+                self._on_success(kind, cost, usage(result))
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "rpm_limit": int(self._requests.capacity),
+                "tpm_limit": int(self._tokens.capacity),
+                "paused_for_s": round(max(0.0, self._paused_until - now), 2),
+                "in_flight": self.in_flight,
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failed": self.failed,
+                "by_kind": {kind: dict(stats) for kind, stats in self._by_kind.items()},
+                "queue_wait_ms": latency_summary(self._wait_seconds),
+                "model_ms": latency_summary(self._model_seconds),
+            }
+
+
+def _describe(error: Exception, delay) -> str:
+    text = f"{error.__class__.__name__} (status {_status_of(error)})"
+    return text if delay is None else f"{text}, retry in {delay:.1f}s"
+
+
+model_limiter = ModelRateLimiter(MODEL_RPM, MODEL_TPM)
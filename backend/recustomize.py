@@ -0,0 +1,106 @@
+# ---- Provenance of stored custom resumes and section-level re-customization ----
+import hashlib
+import json
+from datetime import datetime
+
+from resume_api import start_rewrites, gather_rewrites, merge_tailored
+
+# Written next to every custom_resume.json the batch engine generates
+META_FILENAME = "custom_resume.meta.json"
+META_VERSION = 1
+
+
+def digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def section_hashes(resume: dict) -> dict:
+    """Hash of the base-resume input of each rewrite (see summary_input / experience_input / skills_input)."""
+    return {
+        "summary": digest(resume.get("profile_summary", "")),
+        "skills": digest(resume.get("skills", "")),
+        "experience": [digest(exp.get("responsibilities", "")) for exp in resume.get("experience", [])],
+    }
+
+
+def build_meta(resume: dict, job_info: dict, created_at: str = None) -> dict:
+    """
+    What a custom resume was derived from: the full job_info (so a re-customization
+    needs no new extraction) and hashes of the base resume and of its sections.
+    """
+    now = datetime.utcnow().isoformat()
+    return {
+        "version": META_VERSION,
+        "resume_name": resume.get("name"),
+        "job_info": job_info,
+        "base_hash": digest(resume),
+        "sections": section_hashes(resume),
+        "created_at": created_at or now,
+        "updated_at": now,
+    }
+
+
+def delta_plan(meta: dict, resume: dict) -> dict:
+    """
+    Compare a changed base resume with the one a custom resume was derived from.
+    `rewrite` holds the (section, experience index or None) keys whose model input
+    changed; `reuse` maps every other experience index of the new base to the index
+    of the same responsibilities in the stored custom resume, so reordered or removed
+    entries cost no model call.
+    """
+    old = meta.get("sections", {})
+    new = section_hashes(resume)
+    rewrite = set()
+    if new["summary"] != old.get("summary"):
+        rewrite.add(("summary", None))
+    if new["skills"] != old.get("skills"):
+        rewrite.add(("skills", None))
+
+    old_index = {}
+    for i, h in enumerate(old.get("experience", [])):
+        old_index.setdefault(h, i)
+    reuse = {}
+    for i, h in enumerate(new["experience"]):
+        if h in old_index:
+            reuse[i] = old_index[h]
+        else:
+            rewrite.add(("experience", i))
+    return {"rewrite": rewrite, "reuse": reuse}
+
+
+async def recustomize(custom: dict, meta: dict, resume: dict, max_workers: int = None) -> tuple:
+    """
+    Bring a stored custom resume up to date with a changed base resume. Only the
+    rewrites in the delta plan call the model (always per section, whatever mode
+    produced the file); the tailored text of every other section is kept, and the
+    rest (contact details, education, companies, dates) is taken from the new base.
+    Returns (patched custom resume, number of rewrites run).
+    """
+    job_info = meta["job_info"]
+    plan = delta_plan(meta, resume)
+    old_experience = custom.get("experience", [])
+    rewrite = set(plan["rewrite"])
+    for i, old_i in plan["reuse"].items():
+        # The stored file no longer lines up with its meta (edited by hand?)
+        if old_i >= len(old_experience):
+            rewrite.add(("experience", i))
+
+    results = {}
+    if rewrite:
+        results = await gather_rewrites(start_rewrites(resume, job_info, max_workers, only=rewrite))
+
+    updated_experiences = []
+    for i, exp in enumerate(resume.get("experience", [])):
+        if ("experience", i) in results:
+            updated_experiences.append(results[("experience", i)])
+        else:
+            tailored = old_experience[plan["reuse"][i]].get("responsibilities", exp.get("responsibilities", ""))
+            updated_experiences.append({**exp, "responsibilities": tailored})
+    patched = merge_tailored(
+        resume,
+        job_info,
+        results.get(("summary", None), custom.get("profile_summary", "")),
+        updated_experiences,
+        results.get(("skills", None), custom.get("skills", "")),
+    )
+    return patched, len(results)
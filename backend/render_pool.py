@@ -0,0 +1,129 @@
+# ---- Process pool for CPU-bound PDF rendering ----
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import PDF_QUEUE_WAIT, PDF_RENDER, latency_summary
+from tracing import annotate
+from pdf_renderer import render_pdf_bytes, render_cover_letter_bytes, resume_hash, deterministic_style
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2)))
+# Renders allowed in flight (running + waiting for a worker) before /resume/pdf answers 503
+RENDER_QUEUE_LIMIT = int(os.getenv("RENDER_QUEUE_LIMIT", str(RENDER_WORKERS * 4)))
+RENDER_TIMINGS_WINDOW = 500
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+# --- Worker-side functions (run in the pool processes) ---
+def render_timed(resume: dict, style_id: int) -> tuple:
+    """Return (pdf bytes, seconds spent rendering)."""
+    started = time.perf_counter()
+    pdf = render_pdf_bytes(resume, style_id)
+    return pdf, time.perf_counter() - started
+
+
+def render_export_item(resume_path: str, cover_letter_path: str = None) -> tuple:
+    """
+    Load a stored custom_resume.json (and optional cover_letter.txt) and return
+    ([(kind, pdf bytes), ...], seconds spent rendering). Styles are picked from the resume hash.
+    """
+    started = time.perf_counter()
+    with open(resume_path, "r", encoding="utf-8") as f:
+        resume = json.load(f)
+    style_id = deterministic_style(resume_hash(resume))
+    rendered = [("resume", render_pdf_bytes(resume, style_id))]
+
+    if cover_letter_path and os.path.exists(cover_letter_path):
+        with open(cover_letter_path, "r", encoding="utf-8") as f:
+            cover_letter = f.read()
+        if cover_letter.strip():
+            rendered.append(("cover_letter", render_cover_letter_bytes(resume, cover_letter, style_id)))
+    return rendered, time.perf_counter() - started
+
+
+class RenderBackend:
+    """
+    Dedicated process pool for reportlab layout, so PDF bursts don't hold the GIL
+    or the AnyIO threadpool that serves the lightweight endpoints. In-flight renders
+    are counted, and callers that respect the queue limit get RenderQueueFull
+    instead of waiting behind an unbounded backlog.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._pool = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._render_seconds = deque(maxlen=RENDER_TIMINGS_WINDOW)
+        self._wait_seconds = deque(maxlen=RENDER_TIMINGS_WINDOW)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: the server process has threads running, forking it isn't safe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def run(self, fn, *args, enforce_limit: bool = True):
+        """Run a worker-side function that returns (result, render seconds) and return the result."""
+        with self._lock:
+            if enforce_limit and self.in_flight >= self.queue_limit:
+                self.rejected += 1
+                raise RenderQueueFull(f"{self.in_flight} renders in flight (limit {self.queue_limit})")
+            self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            result, render_seconds = await asyncio.wrap_future(self._get_pool().submit(fn, *args))
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        total = time.perf_counter() - started
+        with self._lock:
+            self.completed += 1
+            self._render_seconds.append(render_seconds)
+            self._wait_seconds.append(max(0.0, total - render_seconds))
+        PDF_RENDER.observe(render_seconds, job=fn.__name__)
+        PDF_QUEUE_WAIT.observe(max(0.0, total - render_seconds), job=fn.__name__)
+        annotate(render_ms=round(render_seconds * 1000, 2), queue_wait_ms=round(max(0.0, total - render_seconds) * 1000, 2))
+        return result
+
+    async def render(self, resume: dict, style_id: int) -> bytes:
+        return await self.run(render_timed, resume, style_id)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "render_ms": latency_summary(self._render_seconds),
+                "queue_wait_ms": latency_summary(self._wait_seconds),
+            }
+
+
+render_backend = RenderBackend(RENDER_WORKERS, RENDER_QUEUE_LIMIT)
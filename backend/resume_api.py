@@ -1,15 +1,29 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Query, HTTPException
 from pydantic import BaseModel
-from typing import List
-import json, os, re
+from typing import List, Optional
+import json, os
 from typing import Dict, Any
 import requests
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
-import time
 from datetime import datetime
 import pytz
 import random
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from model_cache import model_cache, MODEL_CACHE_ENABLED
+from counters import counter_store, iter_days
+from resume_store import ResumeStore
+from rate_limiter import model_limiter
+from metrics import MODEL_CALLS
+from tracing import trace, span, annotate
+from singleflight import AsyncSingleFlight, normalize_text
+from token_budget import (
+    estimate_tokens, record_usage, customize_stats, MODEL_CONTEXT_WINDOW, MODEL_MAX_OUTPUT_TOKENS
+)
+from pdf_renderer import resume_hash, deterministic_style, pdf_cache
+from render_pool import render_backend, RenderQueueFull
 
 load_dotenv()
 
@@ -47,10 +61,11 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_URL = os.getenv("MODEL_URL")
 MODEL_NAME = os.getenv("MODEL_NAME")
 RESUME_PATH = os.getenv("RESUME_PATH")
-client = OpenAI()
-
-COUNTS_DIR = "data/counts"
-os.makedirs(COUNTS_DIR, exist_ok=True)
+# Saved resumes, parsed and validated once per file version
+resume_store = ResumeStore(RESUME_PATH or os.path.join("data", "resumes"), Resume)
+# Retries are owned by the shared model_limiter, not the SDK.
+# The batch engine's worker threads run this async pipeline on the app's event loop too.
+aclient = AsyncOpenAI(max_retries=0)
 
 def increment_customize_count(resume_name: str):
     """Increment daily count for a given resume customization (CET timezone)."""
@@ -59,52 +74,130 @@ def increment_customize_count(resume_name: str):
         cet = pytz.timezone("Europe/Warsaw")  # CET/CEST auto handled
         today = datetime.now(cet).strftime("%Y-%m-%d")
 
-        count_path = os.path.join(COUNTS_DIR, f"{today}.json")
-
-        # Load existing counts or start new
-        if os.path.exists(count_path):
-            with open(count_path, "r", encoding="utf-8") as f:
-                counts = json.load(f)
-        else:
-            counts = {}
-
         # Normalize the name for consistent keys
         key = resume_name.strip().replace(" ", "_").lower()
-        counts[key] = counts.get(key, 0) + 1
-
-        # Save updated count
-        with open(count_path, "w", encoding="utf-8") as f:
-            json.dump(counts, f, indent=2, ensure_ascii=False)
+        counter_store.increment(today, key)
 
     except Exception as e:
         print(f"⚠️ Failed to update count for {resume_name}: {e}")
 
-def call_model(system_prompt: str, user_content: str) -> str:
-    """Reusable helper using OpenAI SDK with retry logic."""
-    for attempt in range(3):  # up to 3 retries
-        try:
-            response = client.chat.completions.create(
-                model=MODEL_NAME,
-                response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content},
-                ],
-            )
-            return response.choices[0].message.content
+# Model calls in flight, shared by concurrent identical requests (routers and batch engine alike)
+model_flights = AsyncSingleFlight("call_model")
 
-        except Exception as e:
-            if "rate_limit" in str(e).lower() or "429" in str(e):
-                wait = 2 ** attempt
-                print(f"⚠️ Rate limit hit. Retrying in {wait}s...")
-                time.sleep(wait)
-                continue
-            else:
-                raise e
-    raise RuntimeError("Failed after 3 retries.")
+async def _cached_response(system_prompt: str, user_content: str, use_cache: bool) -> tuple:
+    """(cache key or None, cached content or None) for a model call."""
+    if not (use_cache and MODEL_CACHE_ENABLED):
+        return None, None
+    cache_key = model_cache.make_key(MODEL_NAME, system_prompt, user_content)
+    return cache_key, await model_cache.aget(cache_key)
+
+def _flight_key(system_prompt: str, user_content: str, response_format: dict) -> str:
+    return model_cache.make_key(
+        MODEL_NAME, system_prompt, json.dumps(response_format, sort_keys=True) + normalize_text(user_content)
+    )
+
+async def call_model(
+    system_prompt: str, user_content: str, use_cache: bool = True, response_format: dict = None, kind: str = "model"
+) -> str:
+    """
+    Reusable helper using OpenAI SDK with retry logic and a persistent response cache.
+    Identical calls already in flight (same prompt, whitespace-normalized input) are
+    joined instead of sent again. response_format defaults to a plain JSON object;
+    kind names the prompt type in the rate limiter stats, /metrics and traces.
+    """
+    with span(f"model.{kind}"):
+        return await _call_model(system_prompt, user_content, use_cache, response_format, kind)
+
+async def _call_model(system_prompt: str, user_content: str, use_cache: bool, response_format: dict, kind: str) -> str:
+    cache_key, cached = await _cached_response(system_prompt, user_content, use_cache)
+    if cached is not None:
+        record_usage(cached=True)
+        MODEL_CALLS.inc(kind=kind, outcome="cached")
+        annotate(cache="hit")
+        return cached
+
+    response_format = response_format or {"type": "json_object"}
+
+    async def run() -> str:
+        response = await create_completion(
+            kind=kind,
+            response_format=response_format,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+        )
+        content = response.choices[0].message.content
+        record_usage(response.usage)
+        if cache_key and content:
+            await model_cache.aset(cache_key, content)
+        return content
+
+    content, shared = await model_flights.do(_flight_key(system_prompt, user_content, response_format), run)
+    if shared:
+        record_usage(cached=True)
+        MODEL_CALLS.inc(kind=kind, outcome="shared")
+        annotate(shared=True)
+    return content
+
+async def create_completion(kind: str = "model", **kwargs):
+    """
+    chat.completions.create on MODEL_NAME through the shared rate limiter, which
+    queues the call under the RPM/TPM budget and retries 429s and transient errors
+    without blocking the event loop.
+    """
+    estimated = sum(estimate_tokens(m.get("content", "")) for m in kwargs.get("messages", []))
+    return await model_limiter.call(
+        lambda: aclient.chat.completions.create(model=MODEL_NAME, **kwargs),
+        kind=kind,
+        estimated_tokens=estimated,
+        usage=_usage,
+    )
+
+def _usage(response):
+    return getattr(response, "usage", None)
+
+@router.get("/cache/stats")
+async def get_model_cache_stats():
+    """Return hit/miss counters and size of the model response cache."""
+    return await run_in_threadpool(model_cache.stats)
+
+@router.delete("/cache")
+async def clear_model_cache():
+    """Drop every cached model response."""
+    await run_in_threadpool(model_cache.clear)
+    return {"success": True}
+
+COVER_LETTER_PROMPT = (
+    "You are an expert career writer and HR communication specialist. "
+    "Given a candidate's resume and a job description, write a concise, professional, "
+    "and personalized cover letter tailored for that job.\n"
+    "Rules:\n"
+    "- Use a formal yet approachable tone.\n"
+    "- Highlight the most relevant skills and experiences from the resume.\n"
+    "- Align achievements to the key requirements of the job description.\n"
+    "- Limit to 3–5 short paragraphs.\n"
+    "- Do not include placeholders like [Company Name] or [Your Name] or even [Date]; fill them in using the given data.\n"
+    "- Don't put any date in cover letter, and for Hiring manager's name, don't put specific name, but just mention as Hiring Manager\n"
+    "- Return JSON with one key: cover_letter (as plain text)."
+)
+
+def cover_letter_input(resume: dict, job_description: str) -> str:
+    return json.dumps(
+        {
+            "resume": resume,
+            "job_description": job_description,
+        },
+        ensure_ascii=False,
+    )
+
+async def write_cover_letter(resume: dict, job_description: str) -> str:
+    """Generate the cover letter text for a resume and job description."""
+    response = json.loads(await call_model(COVER_LETTER_PROMPT, cover_letter_input(resume, job_description), kind="coverletter"))
+    return response.get("cover_letter", "")
 
 @router.post("/coverletter")
-def generate_cover_letter(payload: dict = Body(...)):
+async def generate_cover_letter(payload: dict = Body(...)):
     """
     Generate a personalized cover letter from a resume and job description.
     """
@@ -115,381 +208,613 @@ def generate_cover_letter(payload: dict = Body(...)):
         if not resume or not job_description:
             return {"error": "Missing resume or job_description"}
 
-        # --- Build a compact structured prompt ---
-        system_prompt = (
-            "You are an expert career writer and HR communication specialist. "
-            "Given a candidate's resume and a job description, write a concise, professional, "
-            "and personalized cover letter tailored for that job.\n"
-            "Rules:\n"
-            "- Use a formal yet approachable tone.\n"
-            "- Highlight the most relevant skills and experiences from the resume.\n"
-            "- Align achievements to the key requirements of the job description.\n"
-            "- Limit to 3–5 short paragraphs.\n"
-            "- Do not include placeholders like [Company Name] or [Your Name] or even [Date]; fill them in using the given data.\n"
-            "- Don't put any date in cover letter, and for Hiring manager's name, don't put specific name, but just mention as Hiring Manager\n"
-            "- Return JSON with one key: cover_letter (as plain text)."
-        )
+        with trace("coverletter", resume=resume.get("name")):
+            return {"cover_letter": await write_cover_letter(resume, job_description)}
+
+    except Exception as e:
+        return {"error": str(e)}
+
+# Same rules, but plain text out so the letter can be streamed as it is written
+COVER_LETTER_STREAM_PROMPT = (
+    COVER_LETTER_PROMPT.rsplit("\n", 1)[0]
+    + "\n- Return only the cover letter as plain text, without JSON or Markdown."
+)
+
+def ndjson_line(event: str, **fields) -> str:
+    return json.dumps({"event": event, **fields}, ensure_ascii=False) + "\n"
+
+@router.post("/coverletter/stream")
+async def generate_cover_letter_stream(payload: dict = Body(...)):
+    """
+    Streaming /coverletter: NDJSON lines {"event": "delta", "text"} as the model writes,
+    then {"event": "done", "cover_letter"} (or {"event": "error", "error"}).
+    """
+    resume = payload.get("resume")
+    job_description = payload.get("job_description", "")
+    if not resume or not job_description:
+        return {"error": "Missing resume or job_description"}
+
+    user_input = cover_letter_input(resume, job_description)
+
+    async def stream():
+        cache_key = None
+        if MODEL_CACHE_ENABLED:
+            cache_key = model_cache.make_key(MODEL_NAME, COVER_LETTER_STREAM_PROMPT, user_input)
+            cached = await model_cache.aget(cache_key)
+            if cached is not None:
+                yield ndjson_line("delta", text=cached)
+                yield ndjson_line("done", cover_letter=cached)
+                return
+
+        parts = []
+        try:
+            completion = await create_completion(
+                kind="coverletter_stream",
+                stream=True,
+                messages=[
+                    {"role": "system", "content": COVER_LETTER_STREAM_PROMPT},
+                    {"role": "user", "content": user_input},
+                ],
+            )
+            # Closing the stream (also when the client goes away) drops the upstream request
+            async with completion:
+                async for chunk in completion:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        parts.append(text)
+                        yield ndjson_line("delta", text=text)
+        except Exception as e:
+            yield ndjson_line("error", error=str(e))
+            return
+
+        cover_letter = "".join(parts).strip()
+        if cache_key and cover_letter:
+            await model_cache.aset(cache_key, cover_letter)
+        yield ndjson_line("done", cover_letter=cover_letter)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# --- Prompts used by the customization pipeline ---
+JOB_EXTRACT_PROMPT = (
+    "Extract from this job description a concise summary of:\n"
+    "- role_name (Should be simple and regular term, level should be always Senior -> role name should start from Senior and end with Engineer: Senior *** Engineer, *** should be one word -> if it's something like machine learning -> be in one word like ML) -> \n- company_name\n"
+    "- list of skills (array)\n"
+    "- It should be an array of one skill keyword, seperate different skills into different elements\n"
+    "- A skill can be a framework, a library, strategy, cloud service, third party tool or anything technical related things\n"
+    "- Add all skills even they are in nice-to-have or optional\n"
+    "- Try to find as amany skills as possible\n"
+    "- Sort skills by importancy, primary skills first, related skills second, and behavioral skills latest\n"
+    "Return JSON with keys: role_name, company_name, skills"
+)
+
+SUMMARY_PROMPT = (
+    "You are a professional resume writer. "
+    "Rewrite this profile summary to perfectly match the extracted job skills and role. "
+    "Focus on highlighting the job-required skills first, then original strengths. "
+    "Show numbers in number format -> 9 (not nine) "
+    "Highlight tech stack (in bold font, A skill can be a framework, a library, strategy, cloud service, third party tool or anything technical related things) "
+    "Return JSON with one key: profile_summary."
+)
+
+EXPERIENCE_PROMPT = (
+    "You are a professional resume writer. "
+    "Rewrite these responsibilities to perfectly match the extracted job skills and role. "
+    "Required job skills are : {job_skills}\n"
+    "Job role name is : {job_role}\n"
+    "Focus on highlighting the job-required skills first, then original strengths. "
+    "Express all job skills in bullet points of responsibilities.\n"
+    "Show numbers in number format -> 9 (not nine)\n"
+    "Highlight tech stack (in bold font, A skill can be a framework, a library, strategy, cloud service, third party tool or anything technical related things)\n"
+    "Add at least 3 numbers like measurements and version (add numbers in bullet points), Highlight these as well (in bold font)\n"
+    "Return JSON with one key: responsibilities (as text with newline-separated bullet points)."
+)
+
+SKILLS_PROMPT = (
+    "You are a technical skill curator.\n"
+    "Combine the current resume skills with all job-related skills. "
+    "Required job skills are : {job_skills}\n"
+    "Current skills are : {current_skills}\n"
+    "Keep all original skills, add new ones from job_skills, remove duplicates, "
+    "and reorder skills from job_skills to others\n"
+    "Group skills into different categories, Show Group name first, and show a linebreak, and then a tab padding, after that please show skills\n"
+    "Display in bold font for group names\n"
+    "Add another line break between Groups\n"
+    "These are group names: Programming Languages, Backend Frameworks, Frontend Frameworks, API Technologies, Serverless and Cloud Functions, Databases, DevOps, Cloud & Infrastructure, Other\n"
+    "Return JSON with key: skills (as a comma-separated string)."
+)
+
+# Max number of model calls a single customization runs at the same time
+CUSTOMIZE_CONCURRENCY = int(os.getenv("CUSTOMIZE_CONCURRENCY", "8"))
+
+def summary_input(resume: dict, job_skills: list, job_role: str) -> str:
+    return json.dumps(
+        {
+            "current_summary": resume.get("profile_summary", ""),
+            "job_skills": job_skills,
+            "job_role": job_role,
+        },
+        ensure_ascii=False,
+    )
+
+def experience_input(exp: dict, job_skills: list, job_role: str) -> str:
+    return json.dumps(
+        {
+            "responsibilities": exp["responsibilities"],
+            "job_skills": job_skills,
+            "job_role": job_role,
+        },
+        ensure_ascii=False,
+    )
+
+def skills_input(resume: dict, job_skills: list) -> str:
+    return json.dumps(
+        {"current_skills": resume.get("skills", ""), "job_skills": job_skills},
+        ensure_ascii=False,
+    )
+
+async def extract_job_info(job_description: str) -> dict:
+    """Extract role_name, company_name and skills from a job description."""
+    return json.loads(await call_model(JOB_EXTRACT_PROMPT, job_description, kind="job_extract"))
+
+async def rewrite_summary(resume: dict, job_skills: list, job_role: str) -> str:
+    """Rewrite the profile summary for the extracted job skills and role."""
+    summary_result = json.loads(await call_model(SUMMARY_PROMPT, summary_input(resume, job_skills, job_role), kind="summary"))
+    return summary_result.get("profile_summary", resume.get("profile_summary", ""))
+
+async def rewrite_experience(exp: dict, job_skills: list, job_role: str) -> dict:
+    """Rewrite one experience's responsibilities, keeping the original on failure."""
+    exp = dict(exp)
+    try:
+        exp_result = json.loads(await call_model(EXPERIENCE_PROMPT, experience_input(exp, job_skills, job_role), kind="experience"))
+        exp["responsibilities"] = exp_result.get("responsibilities", exp.get("responsibilities", ""))
+    except Exception:
+        exp["responsibilities"] = exp.get("responsibilities", "")
+    return exp
+
+async def merge_skills(resume: dict, job_skills: list) -> str:
+    """Extend and regroup the resume skills with the job skills."""
+    skills_result = json.loads(await call_model(SKILLS_PROMPT, skills_input(resume, job_skills), kind="skills"))
+    return skills_result.get("skills", resume.get("skills", ""))
+
+def tailor_workers(resume: dict, max_workers: int = None) -> int:
+    return max(1, min(max_workers or CUSTOMIZE_CONCURRENCY, len(resume.get("experience", [])) + 2))
+
+def start_rewrites(resume: dict, job_info: dict, max_workers: int = None, only: set = None) -> dict:
+    """
+    Start the summary, every experience and the skills rewrite as tasks (or just the
+    (section, index) keys in `only`), at most CUSTOMIZE_CONCURRENCY model calls of
+    this customization at a time.
+    Returns {task: (section, experience index or None)}.
+    """
+    job_skills = job_info.get("skills", [])
+    job_role = job_info.get("role_name", "")
+    limit = asyncio.Semaphore(tailor_workers(resume, max_workers))
+    tasks = {}
+
+    async def limited(coro):
+        async with limit:
+            return await coro
+
+    def start(key, fn, *args):
+        if only is None or key in only:
+            tasks[asyncio.ensure_future(limited(fn(*args)))] = key
+
+    start(("summary", None), rewrite_summary, resume, job_skills, job_role)
+    for i, exp in enumerate(resume.get("experience", [])):
+        start(("experience", i), rewrite_experience, exp, job_skills, job_role)
+    start(("skills", None), merge_skills, resume, job_skills)
+    return tasks
+
+async def gather_rewrites(tasks: dict) -> dict:
+    """Wait for the tasks of start_rewrites; returns {(section, index): result}. Cancels the rest on failure."""
+    try:
+        return dict(zip(tasks.values(), await asyncio.gather(*tasks)))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def merge_tailored(resume: dict, job_info: dict, new_summary: str, updated_experiences: list, new_skills: str) -> dict:
+    job_role = job_info.get("role_name", "")
+    updated_resume = resume.copy()
+    updated_resume["profile_summary"] = new_summary
+    updated_resume["experience"] = updated_experiences
+    if updated_experiences:
+        updated_resume["experience"][0]["role"] = job_role
+    updated_resume["skills"] = new_skills
+    updated_resume["role_name"] = job_role
+    updated_resume["apply_company"] = job_info.get("company_name", "")
+    return updated_resume
+
+async def tailor_fanout(resume: dict, job_info: dict, max_workers: int = None) -> dict:
+    """
+    Rewrite summary, every experience and skills for an already extracted job_info.
+    All rewrites are independent, so they run at the same time, capped by
+    CUSTOMIZE_CONCURRENCY.
+    """
+    results = await gather_rewrites(start_rewrites(resume, job_info, max_workers))
+
+    # --- Merge ---
+    updated_experiences = [results[("experience", i)] for i in range(len(resume.get("experience", [])))]
+    return merge_tailored(
+        resume, job_info, results[("summary", None)], updated_experiences, results[("skills", None)]
+    )
+
+# --- One-shot mode: summary, experiences and skills in a single structured call ---
+CUSTOMIZE_MODES = ("auto", "oneshot", "fanout")
+CUSTOMIZE_MODE = os.getenv("CUSTOMIZE_MODE", "fanout")
+# Share of the context window a one-shot call may fill (prompt + expected output)
+ONESHOT_CONTEXT_SHARE = float(os.getenv("ONESHOT_CONTEXT_SHARE", "0.5"))
+# Rewritten text is usually longer than the original (bold markup, extra bullets)
+ONESHOT_OUTPUT_FACTOR = 2
+
+ONESHOT_PROMPT = (
+    "You are a professional resume writer and technical skill curator. "
+    "Tailor the given resume sections to the job in one pass. "
+    "The input has job_skills, job_role, current_summary, experience (index + responsibilities) and current_skills.\n"
+    "profile_summary: rewrite the summary to perfectly match the job skills and role. "
+    "Focus on highlighting the job-required skills first, then original strengths.\n"
+    "experience: for every input index, rewrite the responsibilities to perfectly match the job skills and role. "
+    "Express all job skills in bullet points of responsibilities, as text with newline-separated bullet points. "
+    "Add at least 3 numbers like measurements and version (add numbers in bullet points), Highlight these as well (in bold font).\n"
+    "skills: combine current_skills with all job_skills. Keep all original skills, add new ones from job_skills, "
+    "remove duplicates, and reorder skills from job_skills to others. "
+    "Group skills into different categories, Show Group name first, and show a linebreak, and then a tab padding, after that please show skills. "
+    "Display in bold font for group names. Add another line break between Groups. "
+    "These are group names: Programming Languages, Backend Frameworks, Frontend Frameworks, API Technologies, "
+    "Serverless and Cloud Functions, Databases, DevOps, Cloud & Infrastructure, Other\n"
+    "Everywhere: show numbers in number format -> 9 (not nine), and highlight tech stack "
+    "(in bold font, A skill can be a framework, a library, strategy, cloud service, third party tool or anything technical related things).\n"
+    "Return JSON with keys: profile_summary, experience (array of index + responsibilities), skills."
+)
 
-        user_input = json.dumps(
-            {
-                "resume": resume,
-                "job_description": job_description,
+ONESHOT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "tailored_resume",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["profile_summary", "experience", "skills"],
+            "properties": {
+                "profile_summary": {"type": "string"},
+                "experience": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "required": ["index", "responsibilities"],
+                        "properties": {
+                            "index": {"type": "integer"},
+                            "responsibilities": {"type": "string"},
+                        },
+                    },
+                },
+                "skills": {"type": "string"},
             },
-            ensure_ascii=False,
-        )
+        },
+    },
+}
+
+def oneshot_input(resume: dict, job_info: dict) -> str:
+    return json.dumps(
+        {
+            "job_skills": job_info.get("skills", []),
+            "job_role": job_info.get("role_name", ""),
+            "current_summary": resume.get("profile_summary", ""),
+            "experience": [
+                {"index": i, "responsibilities": exp.get("responsibilities", "")}
+                for i, exp in enumerate(resume.get("experience", []))
+            ],
+            "current_skills": resume.get("skills", ""),
+        },
+        ensure_ascii=False,
+    )
 
-        # --- Call model ---
-        response = json.loads(call_model(system_prompt, user_input))
-        cover_letter = response.get("cover_letter", "")
+def estimate_fanout_tokens(resume: dict, job_info: dict) -> int:
+    """Prompt tokens of the fan-out: every call re-sends the full job_skills list."""
+    job_skills = job_info.get("skills", [])
+    job_role = job_info.get("role_name", "")
+    per_call = estimate_tokens(json.dumps({"job_skills": job_skills, "job_role": job_role}, ensure_ascii=False))
+    total = estimate_tokens(SUMMARY_PROMPT) + estimate_tokens(resume.get("profile_summary", "")) + per_call
+    total += estimate_tokens(SKILLS_PROMPT) + estimate_tokens(resume.get("skills", "")) + per_call
+    for exp in resume.get("experience", []):
+        total += estimate_tokens(EXPERIENCE_PROMPT) + estimate_tokens(exp.get("responsibilities", "")) + per_call
+    return total
+
+def estimate_oneshot_tokens(resume: dict, job_info: dict) -> tuple:
+    """(prompt tokens, expected completion tokens) of a one-shot call."""
+    prompt = estimate_tokens(ONESHOT_PROMPT) + estimate_tokens(oneshot_input(resume, job_info))
+    sections = [resume.get("profile_summary", ""), resume.get("skills", "")]
+    sections += [exp.get("responsibilities", "") for exp in resume.get("experience", [])]
+    completion = sum(estimate_tokens(text) for text in sections) * ONESHOT_OUTPUT_FACTOR
+    completion += estimate_tokens(json.dumps(job_info.get("skills", []), ensure_ascii=False))
+    return prompt, completion
+
+def choose_customize_mode(resume: dict, job_info: dict, mode: str = None) -> str:
+    """
+    Resolve "auto" (or an unknown mode) to oneshot when the single call comfortably
+    fits the model context window and output limit, fanout otherwise.
+    """
+    mode = mode or CUSTOMIZE_MODE
+    if mode in ("oneshot", "fanout"):
+        return mode
+    prompt, completion = estimate_oneshot_tokens(resume, job_info)
+    if prompt + completion <= MODEL_CONTEXT_WINDOW * ONESHOT_CONTEXT_SHARE and completion <= MODEL_MAX_OUTPUT_TOKENS:
+        return "oneshot"
+    return "fanout"
+
+async def tailor_oneshot(resume: dict, job_info: dict) -> dict:
+    """Rewrite summary, every experience and skills with one JSON-schema model call."""
+    result = json.loads(
+        await call_model(ONESHOT_PROMPT, oneshot_input(resume, job_info), response_format=ONESHOT_RESPONSE_FORMAT, kind="oneshot")
+    )
+    return merge_oneshot(resume, job_info, result)
 
-        return {"cover_letter": cover_letter}
+def merge_oneshot(resume: dict, job_info: dict, result: dict) -> dict:
+    rewritten = {
+        item.get("index"): item.get("responsibilities")
+        for item in result.get("experience", [])
+        if isinstance(item, dict)
+    }
+    updated_experiences = []
+    for i, exp in enumerate(resume.get("experience", [])):
+        exp = dict(exp)
+        # An experience the model skipped keeps its original responsibilities
+        exp["responsibilities"] = rewritten.get(i) or exp.get("responsibilities", "")
+        updated_experiences.append(exp)
+    return merge_tailored(
+        resume,
+        job_info,
+        result.get("profile_summary") or resume.get("profile_summary", ""),
+        updated_experiences,
+        result.get("skills") or resume.get("skills", ""),
+    )
 
-    except Exception as e:
-        return {"error": str(e)}
+async def tailor_resume(resume: dict, job_info: dict, max_workers: int = None, mode: str = None) -> dict:
+    """
+    Rewrite summary, experiences and skills in the given mode (default CUSTOMIZE_MODE):
+    fanout = one call per section, oneshot = one structured call, auto = pick by size.
+    A failed one-shot call falls back to the fan-out. Tokens and latency are recorded per mode.
+    """
+    mode = choose_customize_mode(resume, job_info, mode)
+    if mode == "oneshot":
+        try:
+            with span("tailor.oneshot"), customize_stats.measure("oneshot", estimate_oneshot_tokens(resume, job_info)[0]):
+                return await tailor_oneshot(resume, job_info)
+        except Exception as e:
+            print(f"⚠️ One-shot customization failed, falling back to fan-out: {e}")
+    with span("tailor.fanout"), customize_stats.measure("fanout", estimate_fanout_tokens(resume, job_info)):
+        return await tailor_fanout(resume, job_info, max_workers)
 
 @router.post("/customize")
-def customize_resume(payload: dict = Body(...)):
+async def customize_resume(payload: dict = Body(...)):
     """
     Optimized resume customization with:
     1️⃣ Job info extracted once
-    2️⃣ Separate API call for each experience responsibilities
-    3️⃣ Summary rewrite
-    4️⃣ Skills extension/reordering
-    Produces same output as original, but far fewer tokens overall.
+    2️⃣ Summary, each experience and skills rewritten concurrently
+    Produces same output as original, in about two model round-trips.
+    Optional "mode": fanout | oneshot | auto (default CUSTOMIZE_MODE).
     """
     try:
         resume = payload.get("resume")
         job_description = payload.get("job_description", "")
+        mode = payload.get("mode")
         if not resume or not job_description:
             return {"error": "Missing resume or job_description"}
+        if mode and mode not in CUSTOMIZE_MODES:
+            return {"error": f"Unknown mode {mode} (expected one of {', '.join(CUSTOMIZE_MODES)})"}
 
-        # --- 0️⃣ Extract job insights once ---
-        job_extract_prompt = (
-            "Extract from this job description a concise summary of:\n"
-            "- role_name (Should be simple and regular term, level should be always Senior -> role name should start from Senior and end with Engineer: Senior *** Engineer, *** should be one word -> if it's something like machine learning -> be in one word like ML) -> \n- company_name\n"
-            "- list of skills (array)\n"
-            "- It should be an array of one skill keyword, seperate different skills into different elements\n"
-            "- A skill can be a framework, a library, strategy, cloud service, third party tool or anything technical related things\n"
-            "- Add all skills even they are in nice-to-have or optional\n"
-            "- Try to find as amany skills as possible\n"
-            "- Sort skills by importancy, primary skills first, related skills second, and behavioral skills latest\n"
-            "Return JSON with keys: role_name, company_name, skills"
-        )
-        job_info = json.loads(call_model(job_extract_prompt, job_description))
-        job_skills = job_info.get("skills", [])
-        job_role = job_info.get("role_name", "")
-        job_company = job_info.get("company_name", "")
-
-        # --- 1️⃣ Rewrite Profile Summary ---
-        summary_prompt = (
-            "You are a professional resume writer. "
-            "Rewrite this profile summary to perfectly match the extracted job skills and role. "
-            "Focus on highlighting the job-required skills first, then original strengths. "
-            "Show numbers in number format -> 9 (not nine) "
-            "Highlight tech stack (in bold font, A skill can be a framework, a library, strategy, cloud service, third party tool or anything technical related things) "
-            "Return JSON with one key: profile_summary."
-        )
-        summary_input = json.dumps(
-            {
-                "current_summary": resume.get("profile_summary", ""),
-                "job_skills": job_skills,
-                "job_role": job_role,
-            },
-            ensure_ascii=False,
-        )
-        summary_result = json.loads(call_model(summary_prompt, summary_input))
-        new_summary = summary_result.get("profile_summary", resume.get("profile_summary", ""))
-
-        # --- 2️⃣ Rewrite Experience Responsibilities (separate API call per job) ---
-        experiences = resume.get("experience", [])
-        updated_experiences = []
-
-        for idx, exp in enumerate(experiences):
-            exp_prompt = (
-                    "You are a professional resume writer. "
-                    "Rewrite these responsibilities to perfectly match the extracted job skills and role. "
-                    "Required job skills are : {job_skills}\n"
-                    "Job role name is : {job_role}\n"
-                    "Focus on highlighting the job-required skills first, then original strengths. "
-                    "Express all job skills in bullet points of responsibilities.\n"
-                    "Show numbers in number format -> 9 (not nine)\n"
-                    "Highlight tech stack (in bold font, A skill can be a framework, a library, strategy, cloud service, third party tool or anything technical related things)\n"
-                    "Add at least 3 numbers like measurements and version (add numbers in bullet points), Highlight these as well (in bold font)\n"
-                    "Return JSON with one key: responsibilities (as text with newline-separated bullet points)."
-                )
-
-            exp_input = json.dumps(
-                {
-                    "responsibilities": exp["responsibilities"],
-                    "job_skills": job_skills,
-                    "job_role": job_role,
-                },
-                ensure_ascii=False,
-            )
-
-            try:
-                exp_result = json.loads(call_model(exp_prompt, exp_input))
-                # exp["responsibilities"] = exp_result.get("responsibilities", exp.get("responsibilities", ""))
-                exp["responsibilities"] = exp_result.get("responsibilities", exp.get("responsibilities", ""))
-            except Exception as e:
-                exp["responsibilities"] = exp.get("responsibilities", "")
-            updated_experiences.append(exp)
-
-        # --- 3️⃣ Extend and Reorder Skills ---
-        skills_prompt = (
-            "You are a technical skill curator.\n"
-            "Combine the current resume skills with all job-related skills. "
-            "Required job skills are : {job_skills}\n"
-            "Current skills are : {current_skills}\n"
-            "Keep all original skills, add new ones from job_skills, remove duplicates, "
-            "and reorder skills from job_skills to others\n"
-            "Group skills into different categories, Show Group name first, and show a linebreak, and then a tab padding, after that please show skills\n"
-            "Display in bold font for group names\n"
-            "Add another line break between Groups\n"
-            "These are group names: Programming Languages, Backend Frameworks, Frontend Frameworks, API Technologies, Serverless and Cloud Functions, Databases, DevOps, Cloud & Infrastructure, Other\n"
-            "Return JSON with key: skills (as a comma-separated string)."
-        )
-        skills_input = json.dumps(
-            {"current_skills": resume.get("skills", ""), "job_skills": job_skills},
-            ensure_ascii=False,
-        )
-        skills_result = json.loads(call_model(skills_prompt, skills_input))
-        new_skills = skills_result.get("skills", resume.get("skills", ""))
+        resume_name = resume.get("name", "unknown_user")
+        experiences = len(resume.get("experience", []))
+        with trace("customize", resume=resume_name, mode=mode or CUSTOMIZE_MODE, experiences=experiences):
+            # --- 0️⃣ Extract job insights once ---
+            job_info = await extract_job_info(job_description)
 
-        # --- Merge and return ---
-        updated_resume = resume.copy()
-        updated_resume["profile_summary"] = new_summary
-        updated_resume["experience"] = updated_experiences
-        updated_resume["experience"][0]["role"] = job_role
-        updated_resume["skills"] = new_skills
-        updated_resume["role_name"] = job_role
-        updated_resume["apply_company"] = job_company
+            # --- 1️⃣ Rewrite summary, experiences and skills in parallel ---
+            updated_resume = await tailor_resume(resume, job_info, mode=mode)
 
-        resume_name = resume.get("name", "unknown_user")
-        increment_customize_count(resume_name)
+            with span("count"):
+                increment_customize_count(resume_name)
 
         return updated_resume
 
     except Exception as e:
         return {"error": str(e)}
-        
+
+@router.get("/customize/stats")
+async def get_customize_stats():
+    """Rewrite-stage model calls, tokens (estimated and reported) and latency per customization mode."""
+    return {
+        "default_mode": CUSTOMIZE_MODE,
+        "context_window": MODEL_CONTEXT_WINDOW,
+        "modes": customize_stats.stats(),
+    }
+
+@router.post("/customize/stream")
+async def customize_resume_stream(payload: dict = Body(...)):
+    """
+    Streaming /customize, one NDJSON line per step as soon as it is ready:
+    {"event": "job_info"}, then {"event": "summary"}, {"event": "experience", "index"}
+    and {"event": "skills"} in completion order, then {"event": "resume"} with the
+    merged resume (or {"event": "error", "error"}). Rewrites not yet started are
+    dropped when the client disconnects. In oneshot mode the three sections arrive
+    together once the single call is done.
+    """
+    resume = payload.get("resume")
+    job_description = payload.get("job_description", "")
+    mode = payload.get("mode")
+    if not resume or not job_description:
+        return {"error": "Missing resume or job_description"}
+    if mode and mode not in CUSTOMIZE_MODES:
+        return {"error": f"Unknown mode {mode} (expected one of {', '.join(CUSTOMIZE_MODES)})"}
+
+    async def stream():
+        tasks = {}
+        try:
+            job_info = await extract_job_info(job_description)
+            yield ndjson_line("job_info", data=job_info)
+
+            if choose_customize_mode(resume, job_info, mode) == "oneshot":
+                updated_resume = await tailor_resume(resume, job_info, mode="oneshot")
+                yield ndjson_line("summary", data=updated_resume["profile_summary"])
+                for index, exp in enumerate(updated_resume["experience"]):
+                    yield ndjson_line("experience", index=index, data=exp)
+                yield ndjson_line("skills", data=updated_resume["skills"])
+            else:
+                with customize_stats.measure("fanout", estimate_fanout_tokens(resume, job_info)):
+                    tasks = start_rewrites(resume, job_info)
+                    pending = set(tasks)
+                    results = {}
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            section, index = key = tasks[task]
+                            results[key] = task.result()
+                            if section == "experience":
+                                yield ndjson_line(section, index=index, data=results[key])
+                            else:
+                                yield ndjson_line(section, data=results[key])
+
+                updated_experiences = [results[("experience", i)] for i in range(len(resume.get("experience", [])))]
+                updated_resume = merge_tailored(
+                    resume, job_info, results[("summary", None)], updated_experiences, results[("skills", None)]
+                )
+            increment_customize_count(resume.get("name", "unknown_user"))
+            yield ndjson_line("resume", data=updated_resume)
+        except Exception as e:
+            yield ndjson_line("error", error=str(e))
+        finally:
+            # Client went away → stop the rewrites still running
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.post("/")
-def save_resume(resume: Resume):
-    os.makedirs(RESUME_PATH, exist_ok=True)
-    filename = f"{RESUME_PATH}/resume_{resume.name.replace(' ', '_').lower()}.json"
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(resume.dict(), f, indent=2, ensure_ascii=False)
+async def save_resume(
+    resume: Resume,
+    recustomize: bool = Query(False, description="Also patch the stored custom resumes derived from this resume"),
+):
+    filename = await resume_store.asave(resume, notify=recustomize)
     return {"message": f"Resume saved as {filename}", "success": True}
 
+@router.get("/store/stats")
+async def get_resume_store_stats():
+    """Size, version and reload counters of the in-memory resume repository."""
+    return resume_store.stats()
 
 @router.get("/{name}")
-def get_resume(name: str):
-    filename = f"{RESUME_PATH}/resume_{name.replace(' ', '_').lower()}.json"
-    if not os.path.exists(filename):
+async def get_resume(name: str):
+    resume = await resume_store.aget(name)
+    if resume is None:
         return {"error": "Resume not found"}
-    with open(filename, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return resume
 
 @router.get("/")
-def list_resumes():
+async def list_resumes():
     """List available saved resumes."""
-    os.makedirs(RESUME_PATH, exist_ok=True)
-    files = [f for f in os.listdir(RESUME_PATH) if f.startswith("resume_") and f.endswith(".json")]
-    names = [f.replace("resume_", "").replace(".json", "").replace("_", " ").title() for f in files]
-    return {"resumes": names}
-
-from fastapi.responses import StreamingResponse
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, HRFlowable,
-    ListFlowable, ListItem
-)
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib import colors
-import html
-
-def markdown_to_html_bold(text: str) -> str:
-    """Convert Markdown-style bold (**text**) into HTML <b>text</b> tags."""
-    if not text:
-        return ""
-    # Replace pairs of **text** with <b>text</b>
-    return re.sub(r"\*\*(.*?)\*\*", r"<b>\1</b>", text)
-
-def apply_style_variant(style_id: int):
-    """Return color, font, and layout settings based on style_id."""
-    if style_id == 1:
-        return dict(font="Helvetica", accent=colors.HexColor("#007bff"), line_thickness=0.6)
-    elif style_id == 2:
-        return dict(font="Courier", accent=colors.HexColor("#ff6600"), line_thickness=1.0)
-    elif style_id == 3:
-        return dict(font="Times-Roman", accent=colors.HexColor("#28a745"), line_thickness=0.8)
-    elif style_id == 4:
-        return dict(font="Helvetica-Oblique", accent=colors.HexColor("#6610f2"), line_thickness=0.7)
-    elif style_id == 5:
-        return dict(font="Times-Italic", accent=colors.HexColor("#16a085"), line_thickness=0.5)
-    elif style_id == 6:
-        return dict(font="Helvetica-Bold", accent=colors.HexColor("#dc3545"), line_thickness=0.9)
-    else:  # style_id == 7
-        return dict(font="Helvetica", accent=colors.HexColor("#17a2b8"), line_thickness=0.6)
+    return {"resumes": await resume_store.anames()}
+
+# "random" keeps the old behaviour, "deterministic" picks the style from the resume hash
+PDF_STYLE_MODE = os.getenv("PDF_STYLE_MODE", "random")
 
 @router.post("/pdf")
-def generate_resume_pdf(resume: Resume):
-    """Generate a professional resume PDF with bullet points for responsibilities."""
-    style_id = random.randint(1, 7)
-    style = apply_style_variant(style_id)
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=40, leftMargin=40, topMargin=50, bottomMargin=50
-    )
+async def generate_resume_pdf(
+    resume: Resume,
+    style_id: Optional[int] = Query(None, ge=1, le=7, description="Render with this style (1-7)"),
+    style_mode: Optional[str] = Query(None, pattern="^(random|deterministic)$"),
+):
+    """
+    Generate a professional resume PDF with bullet points for responsibilities.
+    Layout runs on the render process pool; when its queue is full this returns 503.
+    """
+    with trace("pdf", resume=resume.name) as root:
+        data = resume.dict()
+        digest = resume_hash(data)
+        if style_id is None:
+            if (style_mode or PDF_STYLE_MODE) == "deterministic":
+                style_id = deterministic_style(digest)
+            else:
+                style_id = random.randint(1, 7)
 
-    # --- Styles using built-in fonts ---
-    st_name = ParagraphStyle(
-        "name",
-        fontName=style["font"],
-        fontSize=20,
-        leading=24,
-        spaceAfter=8,
-        textColor=style["accent"]
-    )
-    st_title = ParagraphStyle("title", fontName="Helvetica-Oblique", fontSize=11.5, leading=14, spaceAfter=10)
-    st_p = ParagraphStyle("p", fontName=style["font"], fontSize=10.5, leading=14)
-    st_section = ParagraphStyle("h2", fontName="Helvetica-Bold", fontSize=13.5, leading=16, spaceBefore=12, spaceAfter=6, textColor=style["accent"])
-    st_bullet = ParagraphStyle("bullet", fontName=style["font"], fontSize=10.5, leading=14, leftIndent=14)
-
-    story = []
-
-    # --- Header ---
-    story.append(Paragraph(html.escape(resume.name or ""), st_name))
-    story.append(Spacer(1, 4))
-    story.append(Paragraph(html.escape(resume.role_name or ""), st_title))
-    contact = " | ".join(
-        [x for x in [resume.email, resume.phone, resume.address] if x]
-    )
-    if contact:
-        story.append(Paragraph(html.escape(contact), st_p))
-    if resume.linkedin:
-        story.append(Paragraph(f"<a href='{html.escape(resume.linkedin)}'>{html.escape(resume.linkedin)}</a>", st_p))
-    story.append(Spacer(1, 10))
-    # story.append(HRFlowable(width="100%", color=colors.black, thickness=0.6, spaceBefore=6, spaceAfter=10))
-    story.append(HRFlowable(
-        width="100%",
-        color=style["accent"],
-        thickness=style["line_thickness"],
-        spaceBefore=6,
-        spaceAfter=10
-    ))
-
-    # --- Profile Summary ---
-    if resume.profile_summary:
-        story.append(Paragraph("Profile Summary", st_section))
-        # story.append(Paragraph(html.escape(resume.profile_summary).replace("\n", "<br/>"), st_p))
-        summary_text = markdown_to_html_bold(resume.profile_summary)
-        summary_text = html.escape(summary_text, quote=False).replace("&lt;b&gt;", "<b>").replace("&lt;/b&gt;", "</b>")
-        summary_text = summary_text.replace("\n", "<br/>")
-        story.append(Paragraph(summary_text, st_p))
-
-    # --- Education ---
-    if resume.education:
-        story.append(Paragraph("Education", st_section))
-        for edu in resume.education:
-            text = (
-                f"<b>{html.escape(edu.degree)}</b> — {html.escape(edu.university)} "
-                f"({html.escape(edu.from_year)}–{html.escape(edu.to_year)})"
-                f"<br/>{html.escape(edu.location)}"
-            )
-            story.append(Paragraph(text, st_p))
-            story.append(Spacer(1, 4))
-
-    # --- Experience ---
-    if resume.experience:
-        story.append(Paragraph("Professional Experience", st_section))
-        for exp in resume.experience:
-            story.append(Paragraph(
-                f"<b>{html.escape(exp.role)}</b> — {html.escape(exp.company)} "
-                f"({html.escape(exp.from_date)}–{html.escape(exp.to_date)})", st_p))
-            if exp.location:
-                story.append(Paragraph(html.escape(exp.location), st_p))
-            story.append(Spacer(1, 4))
-
-            # --- Responsibilities with bullet points ---
-            bullets = [
-                b.strip("•-\u2022\t ") for b in (exp.responsibilities or "").splitlines() if b.strip()
-            ]
-            if bullets:
-                story.append(ListFlowable(
-                    # [ListItem(Paragraph(html.escape(line), st_bullet)) for line in bullets],
-                    [ListItem(Paragraph(
-                        html.escape(markdown_to_html_bold(line), quote=False)
-                            .replace("&lt;b&gt;", "<b>").replace("&lt;/b&gt;", "</b>"),
-                        st_bullet
-                    )) for line in bullets],
-                    bulletType="bullet",
-                    bulletFontName="Helvetica",
-                    bulletFontSize=8.5,
-                    leftIndent=10,
-                    bulletIndent=0
-                ))
-            story.append(Spacer(1, 8))
-
-    # --- Skills ---
-    if resume.skills:
-        story.append(Paragraph("Skills", st_section))
-        # story.append(Paragraph(html.escape(resume.skills).replace("\n", "<br/>"), st_p))
-        skills_text = markdown_to_html_bold(resume.skills)
-        skills_text = html.escape(skills_text, quote=False).replace("&lt;b&gt;", "<b>").replace("&lt;/b&gt;", "</b>")
-        skills_text = skills_text.replace("\n", "<br/>")
-        story.append(Paragraph(skills_text, st_p))
-
-    doc.build(story)
-    buffer.seek(0)
+        key = (digest, style_id)
+        pdf = pdf_cache.get(key)
+        cached = pdf is not None
+        root.set(style_id=style_id, cache="hit" if cached else "miss")
+        if not cached:
+            try:
+                with span("render"):
+                    pdf = await render_backend.render(data, style_id)
+            except RenderQueueFull as e:
+                raise HTTPException(status_code=503, detail=f"PDF renderer busy: {e}", headers={"Retry-After": "1"})
+            pdf_cache.set(key, pdf)
 
     filename = f"{(resume.name or 'resume').replace(' ', '_')}_resume.pdf"
-    return StreamingResponse(
-        buffer,
+    return Response(
+        pdf,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Style-Id": str(style_id),
+            "X-Cache": "hit" if cached else "miss",
+        }
     )
 
-@router.get("/counts/{date}")
-def get_counts(date: str):
-    """
-    Return customization counts for a given date (YYYY-MM-DD).
-    Always include all resumes, even those with 0 counts.
-    """
-    counts_dir = "data/counts"
-    os.makedirs(counts_dir, exist_ok=True)
-    path = os.path.join(counts_dir, f"{date}.json")
-
-    # Load existing counts
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            counts = json.load(f)
-    else:
-        counts = {}
-
-    # ✅ Get all resume names from saved resumes
-    resumes_path = os.getenv("RESUME_PATH", "data/resumes")
-    os.makedirs(resumes_path, exist_ok=True)
-    files = [f for f in os.listdir(resumes_path) if f.startswith("resume_") and f.endswith(".json")]
-    all_resumes = [
-        f.replace("resume_", "").replace(".json", "").replace("_", " ").lower()
-        for f in files
-    ]
-
-    # ✅ Merge counts (include 0 for missing)
-    merged_counts = {}
-    for name in all_resumes:
-        key = name.replace(" ", "_")
-        merged_counts[key] = counts.get(key, 0)
+@router.get("/pdf/cache/stats")
+async def get_pdf_cache_stats():
+    """Return size and hit/miss counters of the rendered PDF cache."""
+    return pdf_cache.stats()
 
+def _merge_with_resumes(counts: dict, resume_keys: list) -> dict:
+    # ✅ Include 0 for resumes without customizations
+    merged_counts = {key: counts.get(key, 0) for key in resume_keys}
     # ✅ Also keep any extra names in counts (if resume file was deleted)
     for key, value in counts.items():
         if key not in merged_counts:
             merged_counts[key] = value
+    return merged_counts
+
+@router.get("/counts/range")
+async def get_counts_range(start: str, end: str):
+    """
+    Return customization counts for every day from start to end (YYYY-MM-DD, inclusive),
+    plus per-resume totals over the whole range.
+    """
+    try:
+        days = list(iter_days(start, end))
+    except ValueError:
+        return {"error": "start and end must be YYYY-MM-DD"}
+    if len(days) > 366:
+        return {"error": "Range is limited to 366 days"}
+
+    by_day = await run_in_threadpool(counter_store.range, start, end)
+    resume_keys = await resume_store.acount_keys()
+    totals = {}
+    result_days = {}
+    for day in days:
+        merged = _merge_with_resumes(by_day.get(day, {}), resume_keys)
+        result_days[day] = {"counts": merged, "total": sum(merged.values())}
+        for key, value in merged.items():
+            totals[key] = totals.get(key, 0) + value
+
+    return {
+        "start": start,
+        "end": end,
+        "days": result_days,
+        "totals": totals,
+        "total": sum(totals.values()),
+        "resumes": list(totals.keys()),
+    }
+
+@router.get("/counts/{date}")
+async def get_counts(date: str):
+    """
+    Return customization counts for a given date (YYYY-MM-DD).
+    Always include all resumes, even those with 0 counts.
+    """
+    counts = await run_in_threadpool(counter_store.get_day, date)
+    merged_counts = _merge_with_resumes(counts, await resume_store.acount_keys())
 
     return {
         "date": date,
@@ -0,0 +1,192 @@
+# ---- In-memory repository of the saved resumes ----
+import json
+import os
+import threading
+import time
+
+import anyio
+
+from metrics import store_timer
+
+# How often the directory is re-scanned for edits made outside the API (seconds)
+RESUME_STORE_CHECK_INTERVAL = float(os.getenv("RESUME_STORE_CHECK_INTERVAL", "2"))
+
+
+def resume_filename(name: str) -> str:
+    return f"resume_{name.replace(' ', '_').lower()}.json"
+
+
+def display_name(filename: str) -> str:
+    return filename.replace("resume_", "").replace(".json", "").replace("_", " ").title()
+
+
+def count_key(filename: str) -> str:
+    return filename.replace("resume_", "").replace(".json", "").replace("_", " ").lower().replace(" ", "_")
+
+
+class ResumeEntry:
+    def __init__(self, filename: str, mtime_ns: int, size: int, data: dict, resume, error: str = None):
+        self.filename = filename
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.data = data  # the file's JSON as saved, served by GET /resume/{name}
+        self.resume = resume  # validated model, None if the file doesn't match it
+        self.error = error
+
+
+class ResumeStore:
+    """
+    Every resume_*.json under path, parsed and validated against `model` once per
+    file version and served from memory. save() updates the entry in place; edits
+    made outside the API are picked up by an (mtime, size) re-scan at most every
+    RESUME_STORE_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self, path: str, model, check_interval: float = RESUME_STORE_CHECK_INTERVAL):
+        self.path = path
+        self.model = model
+        self.check_interval = check_interval
+        self._entries = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.version = 0
+        self.loads = 0
+        self.scans = 0
+
+    # --- Reading ---
+    def stale(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def refresh(self, force: bool = False):
+        """Re-scan the directory and reload only the files whose mtime or size changed."""
+        # Checked before and after taking the lock: readers must not queue behind a scan that isn't due
+        if not force and not self.stale():
+            return
+        with self._lock:
+            if not force and not self.stale():
+                return
+            os.makedirs(self.path, exist_ok=True)
+            seen = set()
+            changed = False
+            with store_timer("resume_store", "scan"), os.scandir(self.path) as it:
+                for item in it:
+                    if not (item.name.startswith("resume_") and item.name.endswith(".json")):
+                        continue
+                    seen.add(item.name)
+                    st = item.stat()
+                    entry = self._entries.get(item.name)
+                    if entry is None or entry.mtime_ns != st.st_mtime_ns or entry.size != st.st_size:
+                        self._load(item.path, item.name, st)
+                        changed = True
+            for filename in set(self._entries) - seen:
+                del self._entries[filename]
+                changed = True
+            if changed:
+                self.version += 1
+            self.scans += 1
+            self._checked_at = time.monotonic()
+
+    def _load(self, full_path: str, filename: str, st):
+        try:
+            with open(full_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Failed to read {filename}: {e}")
+            self._entries.pop(filename, None)
+            return
+        try:
+            resume, error = self.model.model_validate(data), None
+        except Exception as e:
+            resume, error = None, str(e)
+            print(f"⚠️ {filename} is not a valid resume: {e}")
+        self._entries[filename] = ResumeEntry(filename, st.st_mtime_ns, st.st_size, data, resume, error)
+        self.loads += 1
+
+    def get(self, name: str):
+        """Saved resume JSON for a display name, or None. Shared between callers: treat it as read-only."""
+        self.refresh()
+        return self._data(name)
+
+    def get_model(self, name: str):
+        """Validated resume for a display name, or None (missing or invalid)."""
+        self.refresh()
+        entry = self._entries.get(resume_filename(name))
+        return entry.resume if entry else None
+
+    def names(self) -> list:
+        self.refresh()
+        return self._names()
+
+    def count_keys(self) -> list:
+        self.refresh()
+        return self._count_keys()
+
+    # Lookups on the loaded entries, without a refresh
+    def _data(self, name: str):
+        entry = self._entries.get(resume_filename(name))
+        return entry.data if entry else None
+
+    def _names(self) -> list:
+        return [display_name(filename) for filename in list(self._entries)]
+
+    def _count_keys(self) -> list:
+        return [count_key(filename) for filename in list(self._entries)]
+
+    # --- Async wrappers: the directory scan runs off the event loop, and only when it is due ---
+    async def _refresh_async(self):
+        if self.stale():
+            await anyio.to_thread.run_sync(self.refresh)
+
+    async def aget(self, name: str):
+        await self._refresh_async()
+        return self._data(name)
+
+    async def anames(self) -> list:
+        await self._refresh_async()
+        return self._names()
+
+    async def acount_keys(self) -> list:
+        await self._refresh_async()
+        return self._count_keys()
+
+    # --- Writing ---
+    def save(self, resume, notify: bool = False) -> str:
+        """
+        Write a validated resume to disk and make it visible immediately. Returns the file path.
+        With notify, the listeners are called with the saved JSON.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        filename = resume_filename(resume.name)
+        full_path = f"{self.path}/{filename}"
+        data = resume.model_dump()
+        with store_timer("resume_store", "save"), open(full_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        st = os.stat(full_path)
+        with self._lock:
+            self._entries[filename] = ResumeEntry(filename, st.st_mtime_ns, st.st_size, data, resume)
+            self.version += 1
+        for listener in self._listeners if notify else ():
+            try:
+                listener(data)
+            except Exception as e:
+                print(f"⚠️ Resume save listener failed for {filename}: {e}")
+        return full_path
+
+    def add_listener(self, listener):
+        """Call listener(resume JSON) after every save(notify=True); it runs in the saving thread, so keep it short."""
+        self._listeners.append(listener)
+
+    async def asave(self, resume, notify: bool = False) -> str:
+        return await anyio.to_thread.run_sync(self.save, resume, notify)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resumes": len(self._entries),
+                "invalid": [e.filename for e in self._entries.values() if e.resume is None],
+                "version": self.version,
+                "loads": self.loads,
+                "scans": self.scans,
+                "check_interval_s": self.check_interval,
+            }
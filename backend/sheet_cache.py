@@ -0,0 +1,140 @@
+# ---- Cached, conditional Google Sheet link extraction ----
+import asyncio
+import csv
+import os
+import re
+import time
+from collections import OrderedDict
+
+from http_client import http_client
+
+SHEET_CACHE_TTL = float(os.getenv("SHEET_CACHE_TTL", "30"))  # seconds before revalidating
+SHEET_CACHE_MAX_SHEETS = int(os.getenv("SHEET_CACHE_MAX_SHEETS", "64"))
+# Overridden by the benchmarks to serve fixture sheets from bench/fake_openai.py
+SHEET_EXPORT_BASE_URL = os.getenv("SHEET_EXPORT_BASE_URL", "https://docs.google.com").rstrip("/")
+
+URL_RE = re.compile(r"https://[^\s]+")
+
+
+def sheet_export_url(sheet_id: str, sheet_name: str) -> str:
+    return f"{SHEET_EXPORT_BASE_URL}/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+
+
+def link_from_row(row: list):
+    """First-column link of a CSV row (normalized), or None."""
+    if not row:
+        return None
+    val = row[0].strip()
+    if val.startswith("http"):
+        return val
+    match = URL_RE.search(val)
+    return match.group(0) if match else None
+
+
+class SheetEntry:
+    def __init__(self):
+        self.links = []
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0.0
+        self.seen = {}  # link -> cursor of the extract that first returned it
+        # Cursors start at the creation time in ms, so the cursors of an entry that was
+        # evicted (or of an earlier process) are always below those of its replacement
+        self.base = self.cursor = int(time.time() * 1000)
+        self.lock = asyncio.Lock()
+
+
+class SheetCache:
+    """
+    Links of each (sheet_id, sheet_name), kept for SHEET_CACHE_TTL seconds and then
+    revalidated with ETag / If-Modified-Since. The CSV export is parsed as it streams
+    in. Every link remembers the cursor at which it first appeared, so callers can ask
+    for the links added since an earlier extract; a cursor this entry didn't hand
+    out (see is_known_cursor) gets the full list again.
+    """
+
+    def __init__(self, ttl: float, max_sheets: int):
+        self.ttl = ttl
+        self.max_sheets = max_sheets
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+
+    def _entry(self, key: tuple) -> SheetEntry:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = SheetEntry()
+            while len(self._entries) > self.max_sheets:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        return entry
+
+    async def get(self, sheet_id: str, sheet_name: str, fresh: bool = False) -> SheetEntry:
+        entry = self._entry((sheet_id, sheet_name))
+        async with entry.lock:
+            if not fresh and entry.fetched_at and time.monotonic() - entry.fetched_at < self.ttl:
+                self.hits += 1
+                return entry
+            await self._refresh(entry, sheet_export_url(sheet_id, sheet_name))
+            return entry
+
+    async def _refresh(self, entry: SheetEntry, export_url: str):
+        headers = {}
+        if entry.fetched_at:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        async with http_client.stream("GET", export_url, headers=headers) as response:
+            if response.status_code == 304:
+                self.revalidated += 1
+                entry.fetched_at = time.monotonic()
+                return
+            response.raise_for_status()
+
+            links = []
+            pending = ""
+            async for line in response.aiter_lines():
+                # A quoted cell may span lines: wait until the quotes are balanced
+                pending = f"{pending}\n{line}" if pending else line
+                if pending.count('"') % 2:
+                    continue
+                for row in csv.reader([pending]):
+                    link = link_from_row(row)
+                    if link:
+                        links.append(link)
+                pending = ""
+            if pending:
+                for row in csv.reader([pending]):
+                    link = link_from_row(row)
+                    if link:
+                        links.append(link)
+
+        self.downloads += 1
+        entry.etag = response.headers.get("ETag")
+        entry.last_modified = response.headers.get("Last-Modified")
+        entry.fetched_at = time.monotonic()
+        new = [link for link in links if link not in entry.seen]
+        if new or entry.cursor == entry.base:
+            entry.cursor += 1
+            for link in new:
+                entry.seen[link] = entry.cursor
+        entry.links = links
+
+    @staticmethod
+    def is_known_cursor(entry: SheetEntry, since: int) -> bool:
+        return entry.base <= since <= entry.cursor
+
+    def stats(self) -> dict:
+        return {
+            "sheets": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "downloads": self.downloads,
+        }
+
+
+sheet_cache = SheetCache(SHEET_CACHE_TTL, SHEET_CACHE_MAX_SHEETS)
@@ -0,0 +1,44 @@
+# ---- Coalescing of identical in-flight calls ----
+import asyncio
+
+
+# name -> group, for the metrics endpoint
+flight_groups = {}
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so inputs differing only in spacing/newlines share one call."""
+    return " ".join((text or "").split())
+
+
+class AsyncSingleFlight:
+    """
+    The first caller for a key runs fn, callers arriving while it is in flight
+    share its result (or its exception). The call runs as its own task, so a leader
+    whose client disconnects doesn't cancel the work the others are waiting for.
+    """
+
+    def __init__(self, name: str):
+        flight_groups[name] = self
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn) -> tuple:
+        """Await fn() once per key in flight; return (result, shared)."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+        else:
+            self.leaders += 1
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: str, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
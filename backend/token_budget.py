@@ -0,0 +1,116 @@
+# ---- Token estimates and per-mode usage accounting for resume customization ----
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import latency_summary
+
+MODEL_CONTEXT_WINDOW = int(os.getenv("MODEL_CONTEXT_WINDOW", "128000"))
+MODEL_MAX_OUTPUT_TOKENS = int(os.getenv("MODEL_MAX_OUTPUT_TOKENS", "16384"))
+CHARS_PER_TOKEN = 4
+STATS_WINDOW = 500
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text and JSON)."""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class UsageMeter:
+    """Token usage of every model call made while the meter is active (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cached_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, usage=None, cached: bool = False):
+        with self._lock:
+            self.calls += 1
+            if cached:
+                self.cached_calls += 1
+            elif usage is not None:
+                self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+
+# Meter of the customization running in the current context. Worker threads see it
+# when the task is submitted through contextvars.copy_context().run.
+current_meter = ContextVar("current_meter", default=None)
+
+
+def record_usage(usage=None, cached: bool = False):
+    meter = current_meter.get()
+    if meter is not None:
+        meter.add(usage, cached)
+
+
+class ModeStats:
+    """Runs, tokens and latency of the rewrite stage, per customization mode."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._modes = {}
+
+    def _mode(self, mode: str) -> dict:
+        return self._modes.setdefault(mode, {
+            "runs": 0,
+            "failures": 0,
+            "model_calls": 0,
+            "cached_calls": 0,
+            "estimated_prompt_tokens": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "seconds": deque(maxlen=STATS_WINDOW),
+        })
+
+    @contextmanager
+    def measure(self, mode: str, estimated_prompt_tokens: int = 0):
+        """Meter every model call made inside the block and add it to mode's totals."""
+        meter = UsageMeter()
+        token = current_meter.set(meter)
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield meter
+        except BaseException:
+            # Includes a streaming client going away mid-run
+            failed = True
+            raise
+        finally:
+            current_meter.reset(token)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self._mode(mode)
+                stats["runs"] += 1
+                stats["failures"] += failed
+                stats["model_calls"] += meter.calls
+                stats["cached_calls"] += meter.cached_calls
+                stats["estimated_prompt_tokens"] += estimated_prompt_tokens
+                stats["prompt_tokens"] += meter.prompt_tokens
+                stats["completion_tokens"] += meter.completion_tokens
+                if not failed:
+                    stats["seconds"].append(elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for mode, stats in self._modes.items():
+                runs = stats["runs"] or 1
+                out[mode] = {
+                    **{k: v for k, v in stats.items() if k != "seconds"},
+                    "avg_prompt_tokens": round(stats["prompt_tokens"] / runs, 1),
+                    "avg_completion_tokens": round(stats["completion_tokens"] / runs, 1),
+                    "latency_ms": latency_summary(stats["seconds"]),
+                }
+            return out
+
+
+customize_stats = ModeStats()
@@ -0,0 +1,253 @@
+# ---- Per-request span tracing and slow-trace log ----
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1").lower() not in ("0", "false", "no")
+# Traces at least this long are kept in the ring buffer and appended to the JSONL log
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "5000"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", os.path.join("data", "traces", "slow_traces.jsonl"))
+# The log is rotated to <path>.1 once it grows past this
+TRACE_LOG_MAX_BYTES = int(os.getenv("TRACE_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class Span:
+    """One timed stage of a trace. attrs are free-form details (cache hit, retries, sizes...)."""
+
+    def __init__(self, trace, span_id: int, parent_id, name: str, attrs: dict):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+        self.events = []
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def event(self, name: str, **fields):
+        self.events.append({"name": name, "at_ms": _ms(time.perf_counter() - self.start), **fields})
+
+    def to_dict(self, origin: float) -> dict:
+        end = self.end if self.end is not None else time.perf_counter()
+        record = {
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start_ms": _ms(self.start - origin),
+            "duration_ms": _ms(end - self.start),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+        if self.events:
+            record["events"] = list(self.events)
+        return record
+
+
+class Trace:
+    """Spans of one request or background job. Thread-safe: fan-out workers add spans concurrently."""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = datetime.utcnow().isoformat()
+        self.origin = time.perf_counter()
+        self.root = None
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def new_span(self, name: str, parent_id, attrs: dict) -> Span:
+        with self._lock:
+            span = Span(self, len(self._spans) + 1, parent_id, name, attrs)
+            self._spans.append(span)
+        return span
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.root.end if self.root.end is not None else time.perf_counter()
+        return _ms(end - self.origin)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self._spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "attrs": self.root.attrs,
+            "error": self.root.error,
+            "stages": [s.to_dict(self.origin) for s in sorted(spans[1:], key=lambda s: s.start)],
+        }
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+    def event(self, name: str, **fields):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+# Innermost open span of the current request. Worker threads see it when the task is
+# submitted through contextvars.copy_context().run, asyncio tasks inherit it.
+current_span = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def _open(trace: Trace, name: str, parent_id, attrs: dict):
+    span = trace.new_span(name, parent_id, attrs)
+    token = current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{e.__class__.__name__}: {e}"
+        raise
+    finally:
+        span.end = time.perf_counter()
+        current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage of the current trace; a no-op outside of one."""
+    parent = current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    with _open(parent.trace, name, parent.span_id, attrs) as s:
+        yield s
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Start a trace (or, inside one already, just a span) and hand it to trace_log when it ends."""
+    if not TRACE_ENABLED or current_span.get() is not None:
+        with span(name, **attrs) as s:
+            yield s
+        return
+    t = Trace(name)
+    try:
+        with _open(t, name, None, attrs) as root:
+            t.root = root
+            yield root
+    finally:
+        trace_log.finish(t)
+
+
+def annotate(**attrs):
+    """Add details to the innermost open span, if any."""
+    s = current_span.get()
+    if s is not None:
+        s.set(**attrs)
+
+
+def add_event(name: str, **fields):
+    """Record a point-in-time event (a retry, a cache hit...) on the innermost open span, if any."""
+    s = current_span.get()
+    if s is not None:
+        s.event(name, **fields)
+
+
+class TraceLog:
+    """
+    Keeps traces slower than threshold_ms: the last `size` in memory for the
+    /metrics/traces endpoint, all of them appended to a JSONL file. The file is
+    written by a background thread, so finishing a trace never waits on the disk.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: str, threshold_ms: float, size: int, max_bytes: int):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.max_bytes = max_bytes
+        self._recent = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self.finished = 0
+        self.kept = 0
+
+    def finish(self, trace: Trace):
+        duration_ms = trace.duration_ms
+        with self._lock:
+            self.finished += 1
+            if duration_ms < self.threshold_ms:
+                return
+            self.kept += 1
+        record = trace.to_dict()
+        with self._lock:
+            self._recent.append(record)
+        if self.path:
+            self.start()
+            self._queue.put(record)
+
+    def start(self):
+        """Start the writer thread (done on the first slow trace if nobody called it)."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="trace-log-writer", daemon=True)
+                self._writer.start()
+
+    def stop(self):
+        """Write out the queued records and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(self._STOP)
+            writer.join()
+
+    def _write_loop(self):
+        while True:
+            record = self._queue.get()
+            if record is self._STOP:
+                return
+            self._append(record)
+
+    def _append(self, record: dict):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write slow trace log: {e}")
+
+    def slowest(self, limit: int = 10, name: str = None) -> list:
+        with self._lock:
+            records = [r for r in self._recent if name is None or r["name"] == name]
+        return sorted(records, key=lambda r: r["duration_ms"], reverse=True)[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": TRACE_ENABLED,
+                "threshold_ms": self.threshold_ms,
+                "finished": self.finished,
+                "kept": self.kept,
+                "buffered": len(self._recent),
+                "write_queue": self._queue.qsize(),
+                "log_path": self.path,
+            }
+
+
+trace_log = TraceLog(TRACE_LOG_PATH, TRACE_SLOW_MS, TRACE_BUFFER_SIZE, TRACE_LOG_MAX_BYTES)
@@ -11,6 +11,29 @@ FRONTEND_DIR="$PROJECT_DIR/frontend"
 
 # Log file
 LOGFILE="$PROJECT_DIR/startup.log"
+
+# Log rotation: keep LOG_BACKUPS old files once LOGFILE grows past LOG_MAX_BYTES
+LOG_MAX_BYTES="${LOG_MAX_BYTES:-10485760}"  # 10 MB
+LOG_BACKUPS="${LOG_BACKUPS:-5}"
+LOG_CHECK_SECONDS="${LOG_CHECK_SECONDS:-60}"
+ROTATE_PIDFILE="$PROJECT_DIR/.log_rotate.pid"
+
+rotate_log() {
+    [ -f "$LOGFILE" ] || return 0
+    local size
+    size=$(stat -c%s "$LOGFILE" 2>/dev/null || echo 0)
+    [ "$size" -gt "$LOG_MAX_BYTES" ] || return 0
+
+    for i in $(seq $((LOG_BACKUPS - 1)) -1 1); do
+        [ -f "$LOGFILE.$i" ] && mv -f "$LOGFILE.$i" "$LOGFILE.$((i + 1))"
+    done
+    # Copy + truncate: uvicorn and npm keep their O_APPEND handles on LOGFILE
+    cp "$LOGFILE" "$LOGFILE.1"
+    : > "$LOGFILE"
+    echo "Log rotated at $(date) (was $size bytes)" >> "$LOGFILE"
+}
+
+rotate_log
 echo "Starting Resume app at $(date)" >> "$LOGFILE"
 
 # --- Start backend ---
@@ -22,4 +45,9 @@ nohup uvicorn main:app --reload --host 0.0.0.0 --port 8000 >> "$LOGFILE" 2>&1 &
 cd "$FRONTEND_DIR"
 nohup npm start >> "$LOGFILE" 2>&1 &
 
+# --- Keep rotating the log while the app runs ---
+nohup bash -c "$(declare -f rotate_log); LOGFILE='$LOGFILE' LOG_MAX_BYTES='$LOG_MAX_BYTES' LOG_BACKUPS='$LOG_BACKUPS'; \
+    while sleep '$LOG_CHECK_SECONDS'; do rotate_log; done" > /dev/null 2>&1 &
+echo $! > "$ROTATE_PIDFILE"
+
 echo "Resume app started successfully." >> "$LOGFILE"
@@ -13,4 +13,11 @@ pkill -f "uvicorn main:app" || echo "No backend process found." >> "$LOGFILE"
 # Kill frontend (npm start)
 pkill -f "npm start" || echo "No frontend process found." >> "$LOGFILE"
 
+# Kill log rotation loop
+ROTATE_PIDFILE="/home/administrator/Desktop/Resume/.log_rotate.pid"
+if [ -f "$ROTATE_PIDFILE" ]; then
+    kill "$(cat "$ROTATE_PIDFILE")" 2>/dev/null || echo "No log rotation process found." >> "$LOGFILE"
+    rm -f "$ROTATE_PIDFILE"
+fi
+
 echo "Resume app stopped successfully." >> "$LOGFILE"